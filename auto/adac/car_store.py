@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+COLUMN_ID = "id"
+COLUMN_PROCESSED_DATE = "processed date"
+COLUMN_CHECKSUM = "checksum"
+
+
+def _is_nan(value):
+    return isinstance(value, float) and value != value
+
+
+def _to_text(value):
+    if value is None or _is_nan(value):
+        return None
+    if isinstance(value, datetime):
+        # one format for all dates, parsed by datetime.fromisoformat
+        return value.isoformat(timespec="seconds")
+    return str(value)
+
+
+def _to_datetime(text):
+    # dates saved as str(datetime) or read from CSV are ISO 8601 too
+    return None if pd.isna(text) else datetime.fromisoformat(text)
+
+
+def _to_json(data):
+    # NaN of cars imported from CSV is saved as null
+    data = {k: None if _is_nan(v) else v for k, v in data.items()}
+    return json.dumps(data, default=_to_text, ensure_ascii=False)
+
+
+class CarStore(object):
+    """SQLite store of ADAC cars keyed by ADAC id.
+
+    Cars have different sets of columns, so all data of a car is saved as
+    json, only id, processed date and checksum have own columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cars (
+                    id INTEGER PRIMARY KEY,
+                    processed_date TEXT,
+                    checksum TEXT,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return sqlite3.connect(self.path, timeout=60)
+
+    def upsert(self, cars):
+        """Insert new cars, update cars with the same id in place."""
+        rows = [
+            (
+                int(car[COLUMN_ID]),
+                _to_text(car.get(COLUMN_PROCESSED_DATE)),
+                car.get(COLUMN_CHECKSUM),
+                _to_json(car),
+            )
+            for car in cars
+        ]
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                """
+                INSERT INTO cars (id, processed_date, checksum, data)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    processed_date = excluded.processed_date,
+                    checksum = excluded.checksum,
+                    data = excluded.data
+                """,
+                rows,
+            )
+
+    def count(self):
+        with closing(self._connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM cars").fetchone()[0]
+
+    def get_processed(self):
+        """Dict id -> (processed date, checksum), car data is not read."""
+        with closing(self._connect()) as connection:
+            df = pd.read_sql_query(
+                "SELECT id, processed_date, checksum FROM cars", connection
+            )
+
+        processed_dates = [_to_datetime(text) for text in df["processed_date"]]
+        return dict(zip(df["id"], zip(processed_dates, df["checksum"])))
+
+    def to_frame(self):
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT data FROM cars ORDER BY rowid").fetchall()
+
+        df = pd.DataFrame([json.loads(data) for (data,) in rows])
+        if not df.empty:
+            df[COLUMN_ID] = df[COLUMN_ID].astype(int)
+        return df
+
+    def import_csv(self, path):
+        df = pd.read_csv(path)
+        # the last row of a car is the most recent one
+        df = df.drop_duplicates(COLUMN_ID, keep="last")
+        self.upsert(df.to_dict(orient="records"))
+
+    def export_csv(self, path):
+        """Write all cars to CSV, e.g. for find_best_car.get_cars."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.to_frame().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,82 @@
+import os
+from datetime import datetime
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from auto.adac.car_store import CarStore
+
+
+def __get_car(car_id, checksum, **kwargs):
+    car = {
+        "name": f"Car {car_id}",
+        "id": str(car_id),
+        "processed date": datetime(2024, 1, 1),
+        "checksum": checksum,
+    }
+    car.update(kwargs)
+    return car
+
+
+def test_upsert_replaces_car_with_same_id():
+    with TemporaryDirectory() as tmp_dir:
+        store = CarStore(os.path.join(tmp_dir, "adac.sqlite"))
+        store.upsert([__get_car(1, "a", Fixkosten="87 €"), __get_car(2, "b")])
+        store.upsert([__get_car(1, "c", Sitzanzahl="5")])
+
+        df = store.to_frame()
+        assert store.count() == 2
+        assert df["id"].tolist() == [1, 2]
+        assert df["checksum"].tolist() == ["c", "b"]
+        assert df["Sitzanzahl"].tolist()[0] == "5"
+        assert "Fixkosten" not in df
+
+
+def test_import_and_export_csv():
+    with TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "adac.csv")
+        pd.DataFrame(
+            [__get_car(1, "a"), __get_car(2, "b"), __get_car(1, "c", Kosten="1 €")]
+        ).to_csv(csv_path, index=False)
+
+        store = CarStore(os.path.join(tmp_dir, "adac.sqlite"))
+        store.import_csv(csv_path)
+        store.export_csv(csv_path)
+
+        df = pd.read_csv(csv_path)
+        assert sorted(df["id"].tolist()) == [1, 2]
+        assert df[df["id"] == 1]["checksum"].tolist() == ["c"]
+        assert pd.to_datetime(df["processed date"]).eq(datetime(2024, 1, 1)).all()
+
+
+def test_processed_dates_and_checksums():
+    with TemporaryDirectory() as tmp_dir:
+        store = CarStore(os.path.join(tmp_dir, "adac.sqlite"))
+        assert store.get_processed() == {}
+
+        store.upsert([__get_car(1, "a"), __get_car(2, "b", **{"processed date": None})])
+        assert store.get_processed() == {1: (datetime(2024, 1, 1), "a"), 2: (None, "b")}
+
+
+def test_processed_dates_in_mixed_formats():
+    with TemporaryDirectory() as tmp_dir:
+        store = CarStore(os.path.join(tmp_dir, "adac.sqlite"))
+        store.upsert(
+            [
+                __get_car(
+                    1, "a", **{"processed date": datetime(2024, 1, 1, 10, 0, 5, 7)}
+                ),
+                # saved as str(datetime) or imported from CSV
+                __get_car(2, "b", **{"processed date": "2024-01-02 10:00:00.123456"}),
+                __get_car(3, "c", **{"processed date": "2024-01-03"}),
+                __get_car(4, "d", **{"processed date": float("nan")}),
+            ]
+        )
+
+        assert {k: date for k, (date, _) in store.get_processed().items()} == {
+            1: datetime(2024, 1, 1, 10, 0, 5),
+            2: datetime(2024, 1, 2, 10, 0, 0, 123456),
+            3: datetime(2024, 1, 3),
+            4: None,
+        }
+        assert store.to_frame()["processed date"].tolist()[0] == "2024-01-01T10:00:05"
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+
+class State(object):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class CrawlJournal(object):
+    """State of every URL of a crawl, saved in SQLite (e.g. with CarStore).
+
+    Finished URLs (done or skipped) are not visited again when a crawl is
+    resumed, failed ones are retried.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawl (
+                    url TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated TEXT
+                )
+                """
+            )
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return sqlite3.connect(self.path, timeout=60)
+
+    def _insert(self, connection, urls):
+        connection.executemany(
+            "INSERT OR IGNORE INTO crawl (url, state) VALUES (?, ?)",
+            [(url, State.PENDING) for url in urls],
+        )
+
+    def start(self, urls):
+        """New crawl, states of previous crawl are removed."""
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM crawl")
+            self._insert(connection, urls)
+
+    def add(self, urls):
+        """URLs which are not in journal yet are added as pending."""
+        with closing(self._connect()) as connection, connection:
+            self._insert(connection, urls)
+
+    def set_states(self, states):
+        """states - dict url -> state, saved in one transaction."""
+        updated = str(datetime.now())
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "UPDATE crawl SET state = ?, updated = ? WHERE url = ?",
+                [(state, updated, url) for url, state in states.items()],
+            )
+
+    def get_urls(self, states):
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT url FROM crawl WHERE state IN ({','.join('?' * len(states))})"
+                " ORDER BY rowid",
+                list(states),
+            ).fetchall()
+
+        return [url for (url,) in rows]
+
+    def get_counts(self):
+        """Dict state -> number of URLs."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT state, COUNT(*) FROM crawl GROUP BY state"
+            ).fetchall()
+
+        return dict(rows)
@@ -0,0 +1,37 @@
+import os
+from tempfile import TemporaryDirectory
+
+from auto.adac.crawl_journal import CrawlJournal, State
+
+URLS = [f"https://www.adac.de/{i}/" for i in range(5)]
+
+
+def test_resume_from_journal():
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "adac.sqlite")
+        journal = CrawlJournal(path)
+        journal.start(URLS[:4])
+        journal.set_states(
+            {URLS[0]: State.DONE, URLS[1]: State.SKIPPED, URLS[2]: State.FAILED}
+        )
+
+        # e.g. new model URLs were found
+        journal = CrawlJournal(path)
+        journal.add(URLS)
+        assert journal.get_urls([State.PENDING, State.FAILED]) == URLS[2:]
+        assert journal.get_counts() == {
+            State.DONE: 1,
+            State.SKIPPED: 1,
+            State.FAILED: 1,
+            State.PENDING: 2,
+        }
+
+        journal.start(URLS[:2])
+        assert journal.get_urls([State.PENDING]) == URLS[:2]
+
+
+def test_folder_is_created():
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "adac", "adac.sqlite")
+        CrawlJournal(path).start(URLS)
+        assert os.path.exists(path)
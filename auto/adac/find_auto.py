@@ -3,24 +3,31 @@ import json
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from hashlib import md5
 from time import sleep
 
-import numpy as np
 import pandas as pd
 from easelenium.browser import Browser
 from loguru import logger
 from selenium.webdriver.common.by import By
 from tqdm import tqdm
 from utils.lists import flatten
-from utils.misc import concurrent_map, tqdm_concurrent_map
+from utils.misc import concurrent_map
 
-from common_utils import browser_decorator
+from auto.adac.car_store import CarStore
+from auto.adac.crawl_journal import CrawlJournal, State
+from common_utils import browser_decorator, get_browser_pool
 
 TIMEOUT_WAIT_FOR = 15
 
 DAYS_TO_EXPIRE = 5
+# processed cars are saved after every BATCH_SIZE processed URLs
+BATCH_SIZE = 50
+# price ranges with more result pages are split for model URL discovery
+MAX_PAGES_PER_RANGE = 3
+MIN_PRICE_STEP = 500
 RANGE_5 = range(0, 5)
 
 ID_ACCEPT_COOKIES = (By.ID, "cmpwrapper")
@@ -102,6 +109,60 @@ def __get_url_with_queries(
     return browser.get_current_url()
 
 
+def __get_page_count(browser):
+    return max(
+        [1]
+        + [
+            int(e.text)
+            for e in browser.find_elements(by_css='[data-testid="pagination"] a')
+            if e.text
+        ]
+    )
+
+
+@browser_decorator
+def get_page_count(price, min_price=1000, mark=None, new_cars_only=True, browser=None):
+    """Number of result pages for price range, only first page is loaded."""
+    __get_url_with_queries(browser, price, min_price, mark, new_cars_only)
+    return __get_page_count(browser)
+
+
+def _get_p_count(price_range):
+    min_price, price = price_range
+    return get_page_count(price, min_price=min_price)
+
+
+def _split_price_range(
+    min_price,
+    price,
+    func_get_page_count=_get_p_count,
+    func_map=concurrent_map,
+    max_pages=MAX_PAGES_PER_RANGE,
+    min_step=MIN_PRICE_STEP,
+):
+    """Price ranges with up to max_pages result pages each.
+
+    Ranges are bisected recursively, page counts of all ranges of the same
+    depth are read at once with func_map.
+    """
+    price_ranges = []
+    pending = [(min_price, price)]
+    while pending:
+        page_counts = func_map(func_get_page_count, pending)
+
+        next_pending = []
+        for (low, high), page_count in zip(pending, page_counts):
+            # page count is None if it failed - range is not split
+            if page_count is None or page_count <= max_pages or high - low <= min_step:
+                price_ranges.append((low, high))
+            else:
+                middle = (low + high) // 2
+                next_pending += [(low, middle), (middle, high)]
+        pending = next_pending
+
+    return sorted(price_ranges)
+
+
 @browser_decorator
 def get_model_urls(
     price=None,
@@ -122,14 +183,7 @@ def get_model_urls(
     logger.debug(f"Processing {url}")
 
     css_model_link = "tbody a"
-    max_page = max(
-        [1]
-        + [
-            int(e.text)
-            for e in browser.find_elements(by_css='[data-testid="pagination"] a')
-            if e.text
-        ]
-    )
+    max_page = __get_page_count(browser)
 
     model_urls = []
     for page_index in range(1, max_page + 1):
@@ -228,42 +282,43 @@ def get_adac_data(url, browser=None):
     return model_data
 
 
-def __get_data_for_trim_processing(url, df_old_data=None):
-    if df_old_data is not None:
-        ids = df_old_data["id"].unique()
-        processed_ids = set(df_old_data["id"].unique())
-        assert len(ids) == len(processed_ids)
-
-        checksums = df_old_data["checksum"].unique()
-        processed_checksums = set(df_old_data["checksum"].unique())
-        assert len(checksums) == len(processed_checksums)
+def __get_skip_index(store):
+    """Processed dates by id and checksums of all saved cars, built once."""
+    processed = store.get_processed()
+    return {
+        "processed dates": {
+            car_id: processed_date for car_id, (processed_date, _) in processed.items()
+        },
+        "checksums": {checksum for _, checksum in processed.values()},
+    }
 
-        processed_date = df_old_data[df_old_data["id"] == __get_id(url)][
-            "processed date"
-        ]
-    else:
-        checksums = []
-        processed_ids = set()
-        processed_checksums = set()
-        processed_date = datetime.now()
 
+def __get_data_for_trim_processing(url, skip_index):
+    model_id = __get_id(url)
     return {
         "url": url,
-        "ids": processed_ids,
-        "checksums": checksums,
-        "processed date": pd.to_datetime(processed_date),
+        "id": model_id,
+        "checksums": skip_index["checksums"],
+        "processed date": skip_index["processed dates"].get(model_id),
     }
 
 
-def __save_models_and_trims(df_new, path):
-    if os.path.exists(path):
-        df = pd.read_csv(path)
-        # TODO: set index to id and update instead of appen + reset_index !
-        # TODO: remove/update rows if data is too old
-        df = pd.concat([df, df_new])
-    else:
-        df = df_new
-    df.to_csv(path, index=False)
+def __get_store_path(path):
+    return f"{os.path.splitext(path)[0]}.sqlite"
+
+
+def __get_store(path):
+    """Store of cars next to CSV file, CSV is export of the store."""
+    store = CarStore(__get_store_path(path))
+    if not store.count() and os.path.exists(path):
+        # cars collected before the store existed
+        store.import_csv(path)
+    return store
+
+
+def __export(store, path):
+    if store.count():
+        store.export_csv(path)
 
 
 def __get_id(url):
@@ -274,43 +329,81 @@ def __get_id(url):
         return int(re.search(r"mid=(\d+)", url).group(1))
 
 
-def __save_iteratively(urls, path):
-    # TODO: remove/update rows if data is too old
-    if os.path.exists(path):
-        df_old_data = pd.read_csv(path)
-    else:
-        df_old_data = None
+def __map_serial(func, items):
+    for item in tqdm(items):
+        yield item, func(item)
 
-    for url in tqdm(urls):
-        adac_data = __process_trim_url(__get_data_for_trim_processing(url, df_old_data))
 
-        if not adac_data:
-            continue
+def __map_parallel(func, items):
+    """(item, result) pairs in order of completion, no batch waits for the
+    slowest URL. Not started items are cancelled if crawl is interrupted.
+    """
+    executor = ThreadPoolExecutor(max_workers=get_browser_pool().size)
+    try:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def __save_in_batches(urls, path, func_map):
+    """Process URLs, cars and URL states are saved after every BATCH_SIZE
+    results.
+
+    func_map(func, items) yields (item, result) pairs. Returns processed cars.
+    """
+    store = __get_store(path)
+    journal = CrawlJournal(__get_store_path(path))
+    skip_index = __get_skip_index(store)
+
+    cars = []
+    batch_cars = []
+    states = {}
+
+    def __flush():
+        # every car is written once, old row of the same car is replaced
+        store.upsert(batch_cars)
+        journal.set_states(states)
+        cars.extend(batch_cars)
+        batch_cars.clear()
+        states.clear()
+
+    items = [__get_data_for_trim_processing(url, skip_index) for url in urls]
+    for data, (state, car) in func_map(__process_trim_url, items):
+        states[data["url"]] = state
+        if car:
+            batch_cars.append(car)
+        if len(states) >= BATCH_SIZE:
+            __flush()
+    __flush()
+
+    __export(store, path)
+    return cars
 
-        __save_models_and_trims(pd.DataFrame([adac_data]), path)
 
-    return pd.read_csv(path) if urls else pd.DataFrame()
+def __save_iteratively(urls, path):
+    __save_in_batches(urls, path, __map_serial)
+    return pd.read_csv(path) if urls and os.path.exists(path) else pd.DataFrame()
 
 
 def __process_trim_url(data):
+    """Crawl state of URL and car data if car is new or changed."""
     # TODO: tenacity retry if failed
 
     url = data["url"]
     processed_checksums = data["checksums"]
 
-    model_id = __get_id(url)
+    model_id = data["id"]
 
-    is_processed_id = model_id in data["ids"]
-    if is_processed_id:
-        processed_date = data["processed date"].iloc[0]
-        is_too_old = (
-            np.datetime64(datetime.now()) - processed_date
-        ).days > DAYS_TO_EXPIRE
+    processed_date = data["processed date"]
+    if processed_date is not None:
+        is_too_old = (datetime.now() - processed_date).days > DAYS_TO_EXPIRE
         if is_too_old:
             logger.warning(f"{model_id} updated long time ago")
         else:
             logger.debug(f"SKIPPED: {model_id} already processed")
-            return None
+            return State.SKIPPED, None
 
     try:
         adac_data = get_adac_data(url)
@@ -321,60 +414,58 @@ def __process_trim_url(data):
 
     if adac_data is None:
         logger.debug(f"SKIPPED: {model_id} failed to get data")
-        return None
+        return State.FAILED, None
 
     if adac_data["checksum"] in processed_checksums:
         logger.debug(f"SKIPPED: {model_id} same checksum")
-        return None
+        return State.SKIPPED, None
 
     logger.debug(f"Adding {model_id} {adac_data['name']}")
-    return adac_data
+    return State.DONE, adac_data
 
 
 def __save_parallel(urls, path):
-    if os.path.exists(path):
-        df_old_data = pd.read_csv(path)
-    else:
-        df_old_data = None
-
-    data = tqdm_concurrent_map(
-        __process_trim_url,
-        [__get_data_for_trim_processing(url, df_old_data) for url in urls],
-    )
-    df = pd.DataFrame([d for d in data if d])
-
-    __save_models_and_trims(df, path)
-
-    return df
+    return pd.DataFrame(__save_in_batches(urls, path, __map_parallel))
 
 
-def find_auto(price, output_path, json_path, override_model_urls=False, parallel=False):
-    if os.path.exists(json_path) and not override_model_urls:
+def find_auto(
+    price,
+    output_path,
+    json_path,
+    override_model_urls=False,
+    parallel=False,
+    resume=False,
+):
+    """resume - continue previous crawl, only pending and failed URLs are
+    processed. Model URLs of previous crawl are reused.
+    """
+    if os.path.exists(json_path) and (resume or not override_model_urls):
         with open(json_path, mode="r") as f:
             urls = json.load(f)
     else:
-        price_step = 5000
-        # splitting into chunks to multiprocessing - 5000...10000,10000...15000,...
-        prices = [p for p in range(1000, price, price_step)]
-        prices.append(price)
-        chunks = [
-            {"price": prices[i], "min_price": prices[i - 1]}
-            for i in range(1, len(prices))
-        ]
-        if parallel:
-            urls = flatten(
-                concurrent_map(
-                    _get_m_url,
-                    chunks,
-                )
-            )
-        else:
-            urls = flatten([_get_m_url(chunk) for chunk in chunks])
+        func_map = (
+            concurrent_map
+            if parallel
+            else lambda func, items: [func(item) for item in items]
+        )
+        # splitting into chunks with similar number of models to multiprocessing
+        price_ranges = _split_price_range(1000, price, func_map=func_map)
+        logger.info(f"Price ranges: {price_ranges}")
+        chunks = [{"price": high, "min_price": low} for low, high in price_ranges]
+        urls = flatten(func_map(_get_m_url, chunks))
         with open(json_path, mode="w") as f:
             json.dump(urls, f)
 
     logger.info("Total models with different trim levels: {}".format(len(urls)))
 
+    journal = CrawlJournal(__get_store_path(output_path))
+    if resume:
+        journal.add(urls)
+        logger.info(f"Resuming crawl: {journal.get_counts()}")
+        urls = journal.get_urls([State.PENDING, State.FAILED])
+    else:
+        journal.start(urls)
+
     if parallel:
         df = __save_parallel(urls, output_path)
     else:
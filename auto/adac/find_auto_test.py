@@ -1,7 +1,13 @@
+import math
 import os
 from tempfile import TemporaryDirectory
 
-from auto.adac.find_auto import find_auto, get_adac_data, get_model_urls
+from auto.adac.find_auto import (
+    _split_price_range,
+    find_auto,
+    get_adac_data,
+    get_model_urls,
+)
 
 
 def __filter_model_urls(urls, url_part):
@@ -96,3 +102,26 @@ def test_find_cars_iteratevly():
         rows, cols = cars.shape
 
         assert rows >= 3
+
+
+def test_split_price_range():
+    # 100 cars per 1000 € below 20000, 5 above, 20 cars per page
+    def get_page_count(price_range):
+        low, high = price_range
+        cars = (min(high, 20000) - min(low, 20000)) / 10
+        cars += (max(high, 20000) - max(low, 20000)) / 200
+        return math.ceil(cars / 20)
+
+    price_ranges = _split_price_range(
+        1000, 65000, get_page_count, lambda f, items: list(map(f, items))
+    )
+
+    assert price_ranges[0][0] == 1000 and price_ranges[-1][1] == 65000
+    for (_, high), (low, _) in zip(price_ranges, price_ranges[1:]):
+        assert high == low
+    for price_range in price_ranges:
+        assert (
+            get_page_count(price_range) <= 3 or price_range[1] - price_range[0] <= 500
+        )
+    # expensive range is not split as much as cheap ones
+    assert max(high - low for low, high in price_ranges) > 5000
@@ -1,5 +1,8 @@
+import atexit
 import traceback
+from contextlib import contextmanager
 from functools import wraps
+from threading import Condition, local
 
 from easelenium.browser import Browser
 from selenium import webdriver
@@ -22,27 +25,147 @@ def get_browser(name="gc", headless=True):
     return Browser(BROWSER_NAME, options=options)
 
 
+def _quit_browser(browser):
+    try:
+        browser.quit()
+    except WebDriverException:
+        pass
+
+
+def _is_alive(browser):
+    try:
+        browser.get_current_url()
+        return True
+    except WebDriverException:
+        return False
+
+
+class BrowserPool(object):
+    """Thread-safe pool of up to size browsers.
+
+    acquire waits while size browsers are leased. A nested lease (thread
+    already holds a browser, e.g. decorated function calls another one)
+    doesn't wait - it would deadlock - but gets an extra browser which is
+    quit when released. A browser is quit after max_uses leases or after an
+    error in the call which leased it, idle browsers which don't respond
+    (e.g. crashed driver) are replaced.
+    """
+
+    def __init__(self, size=4, max_uses=50, get_browser=get_browser):
+        self.size = size
+        self.max_uses = max_uses
+        self._get_browser = get_browser
+        self._idle = []
+        self._uses = {}
+        # started browsers, leased and idle
+        self._count = 0
+        self._condition = Condition()
+        self._local = local()
+
+    def acquire(self, nested=False):
+        with self._condition:
+            if not nested:
+                self._condition.wait_for(lambda: self._idle or self._count < self.size)
+            browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                self._count += 1
+
+        if browser is not None and not _is_alive(browser):
+            with self._condition:
+                del self._uses[browser]
+            _quit_browser(browser)
+            browser = None
+
+        if browser is None:
+            try:
+                browser = self._get_browser()
+            except BaseException:
+                with self._condition:
+                    self._count -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._uses[browser] = 0
+
+        return browser
+
+    def release(self, browser, failed=False):
+        with self._condition:
+            self._uses[browser] += 1
+            if (
+                not failed
+                and self._uses[browser] < self.max_uses
+                and self._count <= self.size
+            ):
+                self._idle.append(browser)
+                self._condition.notify()
+                return
+
+            del self._uses[browser]
+            self._count -= 1
+            self._condition.notify()
+
+        _quit_browser(browser)
+
+    @contextmanager
+    def lease(self):
+        depth = getattr(self._local, "depth", 0)
+        browser = self.acquire(nested=depth > 0)
+        self._local.depth = depth + 1
+        failed = False
+        try:
+            yield browser
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._local.depth = depth
+            self.release(browser, failed)
+
+    def close(self):
+        with self._condition:
+            browsers, self._idle = self._idle, []
+            for browser in browsers:
+                del self._uses[browser]
+            self._count -= len(browsers)
+            self._condition.notify_all()
+
+        for browser in browsers:
+            _quit_browser(browser)
+
+
+_BROWSER_POOL = BrowserPool()
+atexit.register(lambda: _BROWSER_POOL.close())
+
+
+def set_browser_pool(pool: BrowserPool):
+    global _BROWSER_POOL
+    _BROWSER_POOL.close()
+    _BROWSER_POOL = pool
+
+
+def get_browser_pool():
+    return _BROWSER_POOL
+
+
 def browser_decorator(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        browser = None
         return_value = None
         try:
-            browser = get_browser()
-
-            kwargs["browser"] = browser
-            value = func(*args, **kwargs)
-            return_value = value
+            with get_browser_pool().lease() as browser:
+                kwargs["browser"] = browser
+                try:
+                    return_value = func(*args, **kwargs)
+                except:
+                    try:
+                        browser.save_screenshot()
+                    except:
+                        pass
+                    raise
         except:
-            try:
-                if browser:
-                    browser.save_screenshot()
-            except:
-                pass
             traceback.print_exc()
-        finally:
-            if browser:
-                browser.quit()
 
         return return_value
 
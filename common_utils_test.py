@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+
+import common_utils
+from common_utils import BrowserPool, browser_decorator
+
+
+class __FakeBrowser(object):
+    def __init__(self):
+        self.quit_count = 0
+        self.screenshot_count = 0
+        self.alive = True
+
+    def get_current_url(self):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_count += 1
+
+    def save_screenshot(self):
+        self.screenshot_count += 1
+
+
+def __get_pool(browsers, **kwargs):
+    def get_browser():
+        browser = __FakeBrowser()
+        browsers.append(browser)
+        return browser
+
+    return BrowserPool(get_browser=get_browser, **kwargs)
+
+
+def test_browser_is_reused_and_recycled():
+    browsers = []
+    pool = __get_pool(browsers, size=1, max_uses=3)
+    for _ in range(4):
+        with pool.lease():
+            pass
+
+    assert len(browsers) == 2
+    assert browsers[0].quit_count == 1
+    assert browsers[1].quit_count == 0
+
+
+def test_browser_is_recycled_after_error():
+    browsers = []
+    pool = __get_pool(browsers)
+    try:
+        with pool.lease():
+            raise ValueError()
+    except ValueError:
+        pass
+
+    with pool.lease() as browser:
+        assert browser is not browsers[0]
+    assert browsers[0].quit_count == 1
+
+
+def test_nested_leases_do_not_block():
+    browsers = []
+    pool = __get_pool(browsers, size=1)
+    with pool.lease() as browser:
+        with pool.lease() as nested_browser:
+            assert nested_browser is not browser
+
+    # only size browsers are kept
+    assert sum(b.quit_count for b in browsers) == 1
+    pool.close()
+    assert all(b.quit_count == 1 for b in browsers)
+
+
+def test_leases_wait_for_size_browsers():
+    browsers = []
+    pool = __get_pool(browsers, size=2, max_uses=1000)
+    leased = []
+    max_leased = []
+    lock = threading.Lock()
+
+    def __lease(_):
+        with pool.lease() as browser:
+            with lock:
+                leased.append(browser)
+                max_leased.append(len(leased))
+            time.sleep(0.01)
+            with lock:
+                leased.remove(browser)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(__lease, range(40)))
+
+    assert len(browsers) == 2
+    assert max(max_leased) == 2
+
+
+def test_dead_browser_is_replaced():
+    browsers = []
+    pool = __get_pool(browsers, size=1)
+    with pool.lease():
+        pass
+    browsers[0].alive = False
+
+    with pool.lease() as browser:
+        assert browser is browsers[1]
+    assert browsers[0].quit_count == 1
+
+
+def test_concurrent_leases():
+    browsers = []
+    pool = __get_pool(browsers, size=2, max_uses=1000)
+
+    def __lease(_):
+        with pool.lease() as browser:
+            return browser
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leased = list(executor.map(__lease, range(100)))
+
+    assert set(leased) <= set(browsers)
+    pool.close()
+    assert all(b.quit_count == 1 for b in browsers)
+
+
+def test_browser_decorator_leases_from_pool(monkeypatch):
+    browsers = []
+    monkeypatch.setattr(common_utils, "_BROWSER_POOL", __get_pool(browsers))
+
+    @browser_decorator
+    def get_value(browser=None):
+        return browser
+
+    @browser_decorator
+    def fail(browser=None):
+        raise ValueError()
+
+    assert get_value() is get_value()
+    assert fail() is None
+    assert len(browsers) == 1
+    assert browsers[0].screenshot_count == 1
+    assert browsers[0].quit_count == 1
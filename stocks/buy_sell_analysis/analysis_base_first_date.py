@@ -1,8 +1,11 @@
 import os
 
 import pandas as pd
+
 from stocks.buy_sell_analysis.common import (
+    INTERVALS,
     Column,
+    Executor,
     YahooRange,
     get_date_column_name,
     update_dataframe,
@@ -24,11 +27,27 @@ def _get_best_weekday_diffs(df_symbols):
     symbol = df_symbols[Column.SYMBOL]
     df = update_dataframe(df_symbols[Column.HISTORY], symbol, True)
 
-    return df[[Column.YEAR, Column.WEEK, Column.WEEKDAY, Column.PERCENT]]
+    return df[[Column.YEAR, Column.WEEK, Column.WEEKDAY, Column.SYMBOL, Column.PERCENT]]
 
 
-def get_best_weekday(filename: str, yahoo_range: YahooRange, limit=None):
-    return wrapper(filename, yahoo_range, limit, _get_best_weekday_diffs)
+def get_best_weekday(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
+    return wrapper(
+        filename,
+        yahoo_range,
+        limit,
+        _get_best_weekday_diffs,
+        interval=INTERVALS[Column.WEEKDAY],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
+    )
 
 
 def _get_monthly_diffs(df_symbols):
@@ -38,8 +57,24 @@ def _get_monthly_diffs(df_symbols):
     return df[[Column.YEAR, Column.MONTH, Column.SYMBOL, Column.PERCENT]]
 
 
-def get_best_month(filename: str, yahoo_range: YahooRange, limit=None):
-    return wrapper(filename, yahoo_range, limit, _get_monthly_diffs, interval="1mo")
+def get_best_month(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
+    return wrapper(
+        filename,
+        yahoo_range,
+        limit,
+        _get_monthly_diffs,
+        interval=INTERVALS[Column.MONTH],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
+    )
 
 
 def _get_month_day_diffs(df_symbols):
@@ -49,8 +84,24 @@ def _get_month_day_diffs(df_symbols):
     return df[[Column.YEAR, Column.MONTH, Column.DAY, Column.SYMBOL, Column.PERCENT]]
 
 
-def get_best_month_day(filename: str, yahoo_range: YahooRange, limit=None):
-    return wrapper(filename, yahoo_range, limit, _get_month_day_diffs)
+def get_best_month_day(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
+    return wrapper(
+        filename,
+        yahoo_range,
+        limit,
+        _get_month_day_diffs,
+        interval=INTERVALS[Column.DAY],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
+    )
 
 
 def _get_hour_diffs(df_symbols):
@@ -71,13 +122,23 @@ def _get_hour_diffs(df_symbols):
     ]
 
 
-def get_best_hour(filename: str, yahoo_range: YahooRange, limit=None):
+def get_best_hour(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
     return wrapper(
         filename,
         yahoo_range,
         limit,
         _get_hour_diffs,
-        interval="60m",
+        interval=INTERVALS[Column.HOUR],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
     )
 
 
@@ -103,14 +164,24 @@ def _get_quarter_diffs(df_symbols):
     ]
 
 
-def get_best_quarter(filename: str, yahoo_range: YahooRange, limit=None):
+def get_best_quarter(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
     # The requested range must be within the last 60 days.
     return wrapper(
         filename,
         yahoo_range,
         limit,
         _get_quarter_diffs,
-        interval="15m",
+        interval=INTERVALS[Column.QUARTER],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
     )
 
 
@@ -137,14 +208,24 @@ def _get_time_diffs(df_symbols):
     ]
 
 
-def get_best_time(filename: str, yahoo_range: YahooRange, limit=None):
+def get_best_time(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
     # The requested range must be within the last 60 days.
     return wrapper(
         filename,
         yahoo_range,
         limit,
         _get_time_diffs,
-        interval="30m",
+        interval=INTERVALS[Column.TIME],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
     )
 
 
@@ -162,14 +243,24 @@ def _get_week_diffs(df_symbols):
     ]
 
 
-def get_best_week(filename: str, yahoo_range: YahooRange, limit=None):
+def get_best_week(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
     # The requested range must be within the last 60 days.
     return wrapper(
         filename,
         yahoo_range,
         limit,
         _get_week_diffs,
-        interval="1wk",
+        interval=INTERVALS[Column.WEEK],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
     )
 
 
@@ -189,12 +280,22 @@ def _get_year_day_diffs(df_symbols):
     ]
 
 
-def get_best_year_day(filename: str, yahoo_range: YahooRange, limit=None):
+def get_best_year_day(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit=None,
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
     # The requested range must be within the last 60 days.
     return wrapper(
         filename,
         yahoo_range,
         limit,
         _get_year_day_diffs,
-        interval="1d",
+        interval=INTERVALS[Column.DATE],
+        executor=executor,
+        aggregate_by=aggregate_by,
+        cube_by=cube_by,
     )
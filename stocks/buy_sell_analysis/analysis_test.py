@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.analysis import _normalize_by_period
+from stocks.buy_sell_analysis.common import Column
+
+
+def __get_df():
+    # unsorted unique labels, first data point isn't first row of period
+    return pd.DataFrame(
+        {
+            Column.YEAR: [2020, 2020, 2020, 2021, 2021],
+            Column.DAY: [3, 1, 2, 5, 4],
+            Column.OPEN: [12.0, 10.0, 11.0, 30.0, 20.0],
+        },
+        index=[10, 3, 7, 42, 5],
+    )
+
+
+def test_normalize_by_first_open_of_period():
+    df = _normalize_by_period(__get_df(), "A", [Column.YEAR], Column.DAY, 2)
+
+    assert df.index.tolist() == [10, 3, 7, 42, 5]
+    np.testing.assert_allclose(df[Column.PERCENT], [1.2, 1.0, 1.1, 1.5, 1.0])
+
+
+def test_periods_with_few_points_are_dropped():
+    df = _normalize_by_period(__get_df(), "A", [Column.YEAR], Column.DAY, 3)
+
+    assert df.index.tolist() == [10, 3, 7]
+    assert (df[Column.YEAR] == 2020).all()
+    np.testing.assert_allclose(df[Column.PERCENT], [1.2, 1.0, 1.1])
@@ -0,0 +1,223 @@
+"""Benchmark of analysis functions on synthetic histories.
+
+python -m stocks.buy_sell_analysis.benchmark --symbols 10 100 --intervals 1d 60m
+"""
+
+import csv
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+
+from loguru import logger
+
+from stocks.buy_sell_analysis import analysis, analysis_base_first_date, common
+from stocks.buy_sell_analysis.cache_admin import evict
+from stocks.buy_sell_analysis.common import Executor, YahooRange, wrapper
+from stocks.buy_sell_analysis.providers import SyntheticProvider
+
+MODULES = [analysis, analysis_base_first_date]
+FUNCTIONS = [
+    "_get_monthly_diffs",
+    "_get_week_diffs",
+    "_get_month_day_diffs",
+    "_get_best_weekday_diffs",
+    "_get_year_day_diffs",
+    "_get_hour_diffs",
+    "_get_time_diffs",
+    "_get_quarter_diffs",
+]
+# longest ranges which Yahoo provides for interval
+INTERVAL_RANGES = {
+    "1d": YahooRange.YEARS_20,
+    "60m": YahooRange.YEARS_2,
+    "30m": YahooRange.DAYS_58,
+    "15m": YahooRange.DAYS_58,
+}
+RESULT_COLUMNS = [
+    "run",
+    "commit",
+    "module",
+    "function",
+    "symbols",
+    "interval",
+    "range",
+    "executor",
+    "status",
+    "seconds",
+    "peak_mb",
+    "memory_scope",
+    "input_rows",
+    "output_rows",
+    "rows_per_second",
+]
+
+
+def __get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def __get_input_rows(symbols_path, yahoo_range, interval):
+    start_date, end_date = common._get_formatted_dates(yahoo_range)
+    symbols = common._get_symbols(symbols_path, None)
+    store = common._get_history_store()
+    return sum(
+        store.get(symbol, start_date, end_date, interval).shape[0] for symbol in symbols
+    )
+
+
+def __run_wrapper(symbols_path, func, yahoo_range, interval, executor):
+    # results cached by previous run are removed, history store is kept
+    evict(common.TEMP_FOLDER, 0, 0, with_history=False)
+    return wrapper(symbols_path, yahoo_range, None, func, interval, executor)
+
+
+def __run_function(symbols_path, module, func_name, yahoo_range, interval, executor):
+    """Time and peak memory are measured in separate runs, tracing of
+    allocations would slow down the timed run.
+    """
+    func = getattr(module, func_name)
+    args = (symbols_path, func, yahoo_range, interval, executor)
+
+    start = time.perf_counter()
+    try:
+        df = __run_wrapper(*args)
+    except AssertionError as e:
+        # e.g. hour analysis for daily data
+        logger.debug(f"{func_name} doesn't support {interval}: {e}")
+        return {"status": "unsupported", "output_rows": 0}
+    seconds = time.perf_counter() - start
+
+    if df.empty:
+        logger.warning(f"{func_name} returned no rows for {interval}")
+        return {"status": "empty", "seconds": round(seconds, 4), "output_rows": 0}
+
+    tracemalloc.start()
+    try:
+        __run_wrapper(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": "ok",
+        "seconds": round(seconds, 4),
+        "peak_mb": round(peak / 2**20, 2),
+        "output_rows": df.shape[0],
+    }
+
+
+def run_benchmark(symbol_counts, intervals, executor, output_path, seed=0):
+    provider = SyntheticProvider(seed=seed)
+    common.set_data_provider(provider)
+
+    run = datetime.now().isoformat(timespec="seconds")
+    commit = __get_commit()
+    temp_folder = common.TEMP_FOLDER
+
+    results = []
+    try:
+        for symbols_count in symbol_counts:
+            for interval in intervals:
+                yahoo_range = INTERVAL_RANGES[interval]
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    # every run starts without cached results
+                    common.TEMP_FOLDER = os.path.join(tmp_dir, "cache")
+                    symbols_path = os.path.join(tmp_dir, "symbols.csv")
+                    provider.save_symbols(symbols_path, symbols_count)
+
+                    common.prefetch_history(symbols_path, yahoo_range, None, interval)
+                    input_rows = __get_input_rows(symbols_path, yahoo_range, interval)
+
+                    for module in MODULES:
+                        for func_name in FUNCTIONS:
+                            result = {
+                                "run": run,
+                                "commit": commit,
+                                "module": module.__name__.split(".")[-1],
+                                "function": func_name,
+                                "symbols": symbols_count,
+                                "interval": interval,
+                                "range": yahoo_range.name,
+                                "executor": executor,
+                                # tracemalloc doesn't see process workers
+                                "memory_scope": (
+                                    "parent"
+                                    if executor == Executor.PROCESS
+                                    else "process"
+                                ),
+                                "input_rows": input_rows,
+                            }
+                            result.update(
+                                __run_function(
+                                    symbols_path,
+                                    module,
+                                    func_name,
+                                    yahoo_range,
+                                    interval,
+                                    executor,
+                                )
+                            )
+                            result["rows_per_second"] = (
+                                round(input_rows / result["seconds"])
+                                if result["status"] == "ok" and result["seconds"]
+                                else None
+                            )
+                            logger.info(result)
+                            results.append(result)
+                            __save_result(output_path, result)
+    finally:
+        common.TEMP_FOLDER = temp_folder
+
+    return results
+
+
+def __save_result(output_path, result):
+    is_new_file = not os.path.exists(output_path)
+    with open(output_path, mode="a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if is_new_file:
+            writer.writeheader()
+        writer.writerow(result)
+
+
+def __main():
+    parser = ArgumentParser(description="Benchmark of stock analysis functions")
+    parser.add_argument(
+        "--symbols", nargs="+", type=int, default=[10, 100, 1000], help="universe sizes"
+    )
+    parser.add_argument(
+        "--intervals",
+        nargs="+",
+        default=["1d", "60m", "15m"],
+        choices=sorted(INTERVAL_RANGES),
+    )
+    parser.add_argument(
+        "--executor",
+        default=Executor.THREAD,
+        choices=[Executor.THREAD, Executor.PROCESS, Executor.SERIAL],
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.csv",
+        help="CSV file, results of every run are appended",
+    )
+
+    args = parser.parse_args()
+    run_benchmark(args.symbols, args.intervals, args.executor, args.output, args.seed)
+
+
+if __name__ == "__main__":
+    __main()
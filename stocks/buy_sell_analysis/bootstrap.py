@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+MEAN = "mean"
+CI_LOW = "ci_low"
+CI_HIGH = "ci_high"
+
+N_BOOT = 1000
+# max number of resampled values in memory at once
+CHUNK_SIZE = 10_000_000
+
+
+def _get_boot_means(values, n_boot, rng):
+    boot_means = []
+    boots_per_chunk = max(1, CHUNK_SIZE // len(values))
+    for start in range(0, n_boot, boots_per_chunk):
+        boots = min(boots_per_chunk, n_boot - start)
+        indexes = rng.integers(0, len(values), size=(boots, len(values)))
+        boot_means.append(values[indexes].mean(axis=1))
+    return np.concatenate(boot_means)
+
+
+def get_confidence_intervals(keys, values, ci=95, n_boot=N_BOOT, seed=0):
+    """Mean and bootstrap percentile CI of values per key.
+
+    Every bootstrap sample of a key is drawn at once with NumPy, so it is
+    the same interval seaborn draws with ci but without resampling on every
+    plot.
+    """
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    order = np.argsort(keys, kind="stable")
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    groups = np.split(values[order], starts[1:])
+
+    quantiles = [(100 - ci) / 2, 100 - (100 - ci) / 2]
+    rows = []
+    for group in groups:
+        ci_low, ci_high = np.percentile(_get_boot_means(group, n_boot, rng), quantiles)
+        rows.append((group.mean(), ci_low, ci_high))
+
+    return pd.DataFrame(rows, index=unique_keys, columns=[MEAN, CI_LOW, CI_HIGH])
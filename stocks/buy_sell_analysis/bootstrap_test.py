@@ -0,0 +1,34 @@
+import numpy as np
+
+from stocks.buy_sell_analysis.bootstrap import (
+    CI_HIGH,
+    CI_LOW,
+    MEAN,
+    get_confidence_intervals,
+)
+
+
+def __get_data():
+    rng = np.random.default_rng(0)
+    keys = np.repeat([3, 1, 2], [50, 100, 1000])
+    values = rng.normal(keys, 1)
+    return keys, values
+
+
+def test_confidence_intervals():
+    keys, values = __get_data()
+    df = get_confidence_intervals(keys, values)
+
+    assert df.index.tolist() == [1, 2, 3]
+    for key in [1, 2, 3]:
+        assert np.isclose(df.loc[key, MEAN], values[keys == key].mean())
+    assert (df[CI_LOW] < df[MEAN]).all() and (df[MEAN] < df[CI_HIGH]).all()
+    # more values - narrower interval
+    widths = df[CI_HIGH] - df[CI_LOW]
+    assert widths[2] < widths[1] < widths[3]
+
+
+def test_confidence_intervals_are_reproducible():
+    keys, values = __get_data()
+    df = get_confidence_intervals(keys, values, seed=1)
+    assert df.equals(get_confidence_intervals(keys, values, seed=1))
@@ -0,0 +1,182 @@
+"""Size and age bounded cache of analysis results and histories.
+
+python -m stocks.buy_sell_analysis.cache_admin list
+python -m stocks.buy_sell_analysis.cache_admin prune --max-mb 1024 --max-days 7
+"""
+
+import os
+import time
+from argparse import ArgumentParser
+from collections import namedtuple
+
+import pandas as pd
+from loguru import logger
+
+from stocks.buy_sell_analysis.columnar_cache import EXTENSION, read_metadata
+
+ORIGIN = "origin"
+# not results - ISIN tables and files being written
+_SKIPPED_EXTENSIONS = (".json", ".tmp")
+# history stores of all providers, {folder}/history/{provider}/{interval}/
+HISTORY_FOLDER = "history"
+# files of history of one symbol, coverage is removed first
+_HISTORY_EXTENSIONS = (".json", ".npy", ".pkl")
+
+CacheEntry = namedtuple("CacheEntry", ["path", "size", "mtime", "origin"])
+
+
+def _get_origin(path):
+    if not path.endswith(f".{EXTENSION}"):
+        return None
+
+    try:
+        return read_metadata(path).get(ORIGIN)
+    except OSError:
+        return None
+
+
+def _get_history_entries(folder):
+    """One entry per symbol and interval, origin is HISTORY_FOLDER and path
+    is path of bars. Reads of history update mtime of bars.
+    """
+    entries = []
+    for root, _, names in os.walk(os.path.join(folder, HISTORY_FOLDER)):
+        stats = {}
+        for name in names:
+            base, extension = os.path.splitext(name)
+            if extension not in _HISTORY_EXTENSIONS:
+                continue
+
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                # removed by another process
+                continue
+            stats.setdefault(base, []).append(stat)
+
+        for base, base_stats in stats.items():
+            entries.append(
+                CacheEntry(
+                    os.path.join(root, f"{base}.pkl"),
+                    sum(s.st_size for s in base_stats),
+                    max(s.st_mtime for s in base_stats),
+                    HISTORY_FOLDER,
+                )
+            )
+
+    return entries
+
+
+def get_entries(folder, with_origin=False, with_history=True):
+    """Cached results and histories in folder, least recently used first.
+
+    Without with_origin only file stats are read, origin of results is None.
+    """
+    if not os.path.isdir(folder):
+        return []
+
+    entries = []
+    for entry in os.scandir(folder):
+        if not entry.is_file() or entry.name.endswith(_SKIPPED_EXTENSIONS):
+            continue
+
+        stat = entry.stat()
+        origin = _get_origin(entry.path) if with_origin else None
+        entries.append(CacheEntry(entry.path, stat.st_size, stat.st_mtime, origin))
+
+    if with_history:
+        entries += _get_history_entries(folder)
+
+    return sorted(entries, key=lambda e: e.mtime)
+
+
+def _remove(entry):
+    if entry.origin == HISTORY_FOLDER:
+        base = os.path.splitext(entry.path)[0]
+        paths = [f"{base}{extension}" for extension in _HISTORY_EXTENSIONS]
+    else:
+        paths = [entry.path]
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # removed by another process
+            pass
+
+
+def evict(folder, max_bytes, max_age, now=None, with_history=True):
+    """Remove entries older than max_age seconds, then least recently used
+    entries until all entries fit in max_bytes. Removed entries are returned.
+
+    Histories of symbols are evicted like results, history which wasn't
+    read for max_age is downloaded again when it's needed.
+    """
+    now = now or time.time()
+    entries = get_entries(folder, with_history=with_history)
+    total = sum(e.size for e in entries)
+
+    removed = []
+    for entry in entries:
+        if now - entry.mtime <= max_age and total <= max_bytes:
+            break
+
+        _remove(entry)
+        total -= entry.size
+        removed.append(entry)
+
+    if removed:
+        logger.debug(
+            f"Removed {len(removed)} cached results "
+            f"({sum(e.size for e in removed) / 2**20:.1f} MB) from {folder}"
+        )
+    return removed
+
+
+def _to_frame(folder, entries, now=None):
+    now = now or time.time()
+    return pd.DataFrame(
+        {
+            "file": [os.path.relpath(e.path, folder) for e in entries],
+            "size_mb": [round(e.size / 2**20, 2) for e in entries],
+            "age_days": [round((now - e.mtime) / 86400, 1) for e in entries],
+            ORIGIN: [e.origin for e in entries],
+        }
+    )
+
+
+def __main():
+    # common imports this module
+    from stocks.buy_sell_analysis.common import (
+        CACHE_MAX_DAYS,
+        CACHE_MAX_MB,
+        TEMP_FOLDER,
+    )
+
+    parser = ArgumentParser(description="Cached analysis results")
+    parser.add_argument("--folder", default=TEMP_FOLDER)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="entries, most recently used first")
+    prune_parser = subparsers.add_parser("prune", help="remove old entries")
+    prune_parser.add_argument("--max-mb", type=float, default=CACHE_MAX_MB)
+    prune_parser.add_argument("--max-days", type=float, default=CACHE_MAX_DAYS)
+
+    args = parser.parse_args()
+    if args.command == "list":
+        entries = get_entries(args.folder, with_origin=True)[::-1]
+        if entries:
+            print(_to_frame(args.folder, entries).to_markdown(index=False))
+        print(
+            f"{len(entries)} entries, "
+            f"{sum(e.size for e in entries) / 2**20:.1f} MB in {args.folder}"
+        )
+    elif args.command == "prune":
+        removed = evict(args.folder, args.max_mb * 2**20, args.max_days * 86400)
+        print(
+            f"Removed {len(removed)} entries, "
+            f"{sum(e.size for e in removed) / 2**20:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    __main()
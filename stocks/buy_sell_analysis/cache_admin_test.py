@@ -0,0 +1,85 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from stocks.buy_sell_analysis.cache_admin import (
+    HISTORY_FOLDER,
+    ORIGIN,
+    evict,
+    get_entries,
+)
+from stocks.buy_sell_analysis.columnar_cache import get_frame_path, write_frame
+from stocks.buy_sell_analysis.history_store import HistoryStore
+
+DAY = 24 * 60 * 60
+NOW = 100 * DAY
+
+
+def __write_entries(folder, ages):
+    for i, age in enumerate(ages):
+        path = get_frame_path(f"hashsum{i}", folder)
+        write_frame(path, pd.DataFrame({"a": range(1000)}), {ORIGIN: f"func{i}"})
+        os.utime(path, (NOW - age * DAY, NOW - age * DAY))
+
+
+def test_entries_with_origin():
+    with TemporaryDirectory() as tmp_dir:
+        __write_entries(tmp_dir, [1, 3, 2])
+        with open(os.path.join(tmp_dir, "isin_symbols.json"), mode="w") as f:
+            f.write("{}")
+        os.makedirs(os.path.join(tmp_dir, "history"))
+
+        entries = get_entries(tmp_dir, with_origin=True)
+        assert [e.origin for e in entries] == ["func1", "func2", "func0"]
+        # only file stats are read by default
+        assert [e.origin for e in get_entries(tmp_dir)] == [None] * 3
+
+
+def test_evict_old_and_least_recently_used():
+    with TemporaryDirectory() as tmp_dir:
+        __write_entries(tmp_dir, [1, 40, 2, 3])
+        size = get_entries(tmp_dir)[0].size
+
+        removed = evict(tmp_dir, 2 * size, 30 * DAY, now=NOW)
+        assert [os.path.basename(e.path) for e in removed] == [
+            "hashsum1.feather",
+            "hashsum3.feather",
+        ]
+        entries = get_entries(tmp_dir, with_origin=True)
+        assert [e.origin for e in entries] == ["func2", "func0"]
+
+
+def test_histories_are_counted_and_evicted():
+    with TemporaryDirectory() as tmp_dir:
+        __write_entries(tmp_dir, [1])
+        store = HistoryStore(os.path.join(tmp_dir, HISTORY_FOLDER, "yahoo"))
+        index = pd.date_range("2020-01-01", periods=100, name="Date")
+        for symbol, age in [("AAA", 40), ("BBB.DE", 2)]:
+            df = pd.DataFrame({"Open": range(100)}, index=index)
+            store.write(symbol, "1d", df, {"start": "2020-01-01", "end": "2020-04-10"})
+            for extension in ["pkl", "npy", "json"]:
+                path = store._get_path(symbol, "1d", extension)
+                os.utime(path, (NOW - age * DAY, NOW - age * DAY))
+
+        entries = get_entries(tmp_dir)
+        assert [e.origin for e in entries] == [HISTORY_FOLDER, HISTORY_FOLDER, None]
+        assert entries[0].size == sum(
+            os.path.getsize(store._get_path("AAA", "1d", extension))
+            for extension in ["pkl", "npy", "json"]
+        )
+
+        removed = evict(tmp_dir, 2**30, 30 * DAY, now=NOW)
+        assert [e.path for e in removed] == [store._get_path("AAA", "1d", "pkl")]
+        assert store.get_coverage("AAA", "1d") is None
+        assert sorted(os.listdir(os.path.join(store.folder, "1d"))) == [
+            "BBB.DE.json",
+            "BBB.DE.npy",
+            "BBB.DE.pkl",
+        ]
+
+        # reads keep history
+        store.read("BBB.DE", "1d")
+        assert evict(tmp_dir, 0, 30 * DAY, with_history=False)
+        assert evict(tmp_dir, 2**30, 30 * DAY) == []
+        assert store.get_coverage("BBB.DE", "1d") is not None
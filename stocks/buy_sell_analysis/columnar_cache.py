@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+EXTENSION = "feather"
+
+
+def get_frame_path(hashsum, folder):
+    return os.path.join(folder, f"{hashsum}.{EXTENSION}")
+
+
+def is_supported_frame(value):
+    return (
+        isinstance(value, pd.DataFrame)
+        and not isinstance(value.columns, pd.MultiIndex)
+        and all(isinstance(column, str) for column in value.columns)
+    )
+
+
+def write_frame(path, df, metadata=None):
+    """Write DataFrame as uncompressed Arrow IPC (Feather v2) file.
+
+    Uncompressed files can be memory-mapped, so reading few columns or rows
+    doesn't deserialize the whole frame. metadata (dict str -> str) is saved
+    in schema, see read_metadata.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pandas(df)
+    if metadata:
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, **{k: str(v) for k, v in metadata.items()}}
+        )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def read_metadata(path):
+    """Metadata saved by write_frame, the frame itself is not read."""
+    with pa.memory_map(path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+
+    return {
+        key.decode("utf8"): value.decode("utf8")
+        for key, value in metadata.items()
+        if key != b"pandas"
+    }
+
+
+def _filter_table(table, filters):
+    for column, values in filters.items():
+        table = table.filter(pc.is_in(table[column], value_set=pa.array(values)))
+    return table
+
+
+def read_frame(path, columns=None, filters=None):
+    """Read DataFrame from memory-mapped file.
+
+    columns - only these columns are read
+    filters - dict column -> values, only rows with these values are read
+    """
+    filters = filters or {}
+    read_columns = None
+    if columns is not None:
+        with pa.memory_map(path) as source:
+            if not pa.ipc.open_file(source).schema.names:
+                # empty frame was cached, it has no columns to read
+                return pd.DataFrame()
+        read_columns = list(dict.fromkeys(list(columns) + list(filters)))
+
+    table = feather.read_table(path, columns=read_columns, memory_map=True)
+    table = _filter_table(table, filters)
+    if columns is not None:
+        table = table.select(list(columns))
+
+    return table.to_pandas()
+
+
+def select_frame(df, columns=None, filters=None):
+    """Same selection as read_frame but for DataFrame in memory."""
+    for column, values in (filters or {}).items():
+        df = df[df[column].isin(values)]
+    if columns is not None and not df.columns.empty:
+        df = df[list(columns)]
+    return df
@@ -0,0 +1,58 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from stocks.buy_sell_analysis.columnar_cache import (
+    get_frame_path,
+    is_supported_frame,
+    read_frame,
+    write_frame,
+)
+
+
+def __get_df():
+    return pd.DataFrame(
+        {
+            "Symbol": pd.Categorical(["A", "A", "B", "C"]),
+            "year": pd.Series([2020, 2021, 2020, 2021], dtype="int16"),
+            "Percent (mean)": pd.Series([1.0, 2.0, 3.0, 4.0], dtype="float32"),
+        }
+    )
+
+
+def test_write_and_read_frame():
+    df = __get_df()
+    with TemporaryDirectory() as tmp_dir:
+        path = get_frame_path("hashsum", tmp_dir)
+        write_frame(path, df)
+        assert os.path.exists(path)
+        pd.testing.assert_frame_equal(read_frame(path), df)
+
+
+def test_read_columns_and_symbols():
+    df = __get_df()
+    with TemporaryDirectory() as tmp_dir:
+        path = get_frame_path("hashsum", tmp_dir)
+        write_frame(path, df)
+
+        df_read = read_frame(
+            path, columns=["year", "Percent (mean)"], filters={"Symbol": ["A", "C"]}
+        )
+        assert df_read.columns.tolist() == ["year", "Percent (mean)"]
+        assert df_read["year"].tolist() == [2020, 2021, 2021]
+
+
+def test_read_columns_of_empty_frame():
+    with TemporaryDirectory() as tmp_dir:
+        path = get_frame_path("hashsum", tmp_dir)
+        write_frame(path, pd.DataFrame())
+
+        assert read_frame(path, columns=["year", "Percent (mean)"]).empty
+
+
+def test_multiindex_columns_not_supported():
+    df = pd.concat({"A": __get_df()}, axis=1)
+    assert not is_supported_frame(df)
+    assert not is_supported_frame(["A"])
+    assert is_supported_frame(__get_df())
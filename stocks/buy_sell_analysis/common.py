@@ -1,18 +1,38 @@
+import glob
+import multiprocessing
 import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from enum import IntEnum, auto
+from functools import partial
 
 import numpy as np
 import pandas as pd
-import requests
-import yfinance as yf
 from loguru import logger
-from matplotlib import pyplot
-from seaborn import barplot, boxplot, lineplot, scatterplot
 from utils.misc import concurrent_map
 
 from caching_utils import get_cached_value, get_hashsum
+from stocks.buy_sell_analysis.bootstrap import (
+    CI_HIGH,
+    CI_LOW,
+    MEAN,
+    get_confidence_intervals,
+)
+from stocks.buy_sell_analysis.cache_admin import HISTORY_FOLDER, ORIGIN, evict
+from stocks.buy_sell_analysis.columnar_cache import (
+    EXTENSION,
+    get_frame_path,
+    is_supported_frame,
+    read_frame,
+    select_frame,
+    write_frame,
+)
+from stocks.buy_sell_analysis.fingerprint import get_code_fingerprint
+from stocks.buy_sell_analysis.history_store import HistoryStore
+from stocks.buy_sell_analysis.providers import DataProvider, YahooProvider
+from stocks.buy_sell_analysis.running_stats import RunningStats, get_stats
+from stocks.buy_sell_analysis.symbol_table import SymbolTable
 
 
 class YahooRange(IntEnum):
@@ -38,6 +58,8 @@ class Column(object):
     SYMBOL = "Symbol"
     ISIN = "ISIN"
     PERCENT = "Percent (mean)"
+    VARIANCE = "Percent (variance)"
+    COUNT = "count"
     HISTORY = "history"
     TIME = "time"
     QUARTER = "quarter"
@@ -57,34 +79,155 @@ class Column(object):
     ]
 
 
+class Executor(object):
+    THREAD = "thread"
+    PROCESS = "process"
+    SERIAL = "serial"
+
+
+RESULT_SCHEMA = {
+    Column.YEAR: np.int16,
+    Column.MONTH: np.int8,
+    Column.WEEK: np.int8,
+    Column.WEEKDAY: np.int8,
+    Column.DAY: np.int8,
+    Column.HOUR: np.int8,
+    Column.MINUTE: np.int8,
+    Column.QUARTER: np.int8,
+    Column.TIME: np.float32,
+    Column.PERCENT: np.float32,
+}
+
+# bar interval of every analysis by its bucket column
+INTERVALS = {
+    Column.MONTH: "1mo",
+    Column.WEEK: "1wk",
+    Column.DAY: "1d",
+    Column.WEEKDAY: "1d",
+    Column.DATE: "1d",
+    Column.HOUR: "60m",
+    Column.TIME: "30m",
+    Column.QUARTER: "15m",
+}
+
 TEMP_FOLDER = os.path.join(tempfile.gettempdir(), "stock_analysis")
 
+DOWNLOAD_BATCH_SIZE = 100
+DOWNLOAD_CONCURRENCY = 4
+ISIN_LOOKUP_CONCURRENCY = 8
+# start method of process executor workers, None - default of platform
+PROCESS_START_METHOD = None
+
+# cached results and histories above these limits are removed after every
+# analysis
+CACHE_MAX_MB = 2048
+CACHE_MAX_DAYS = 30
+
 
 def _get_hashsum(*args):
     return get_hashsum(*args)
 
 
-def _get_cached_value(hashsum, func_get_value):
-    return get_cached_value(hashsum, func_get_value, TEMP_FOLDER)
+def _get_legacy_path(hashsum):
+    """File of value cached by caching_utils (values cached before columnar
+    cache or values that are not DataFrames), None if not cached.
+    """
+    for path in glob.glob(os.path.join(glob.escape(TEMP_FOLDER), f"{hashsum}*")):
+        if not path.endswith((f".{EXTENSION}", ".tmp")):
+            return path
 
+    return None
 
-def get_history(symbols, start_date, end_date, interval):
-    hashsum = _get_hashsum(
-        get_history.__name__, ",".join(symbols), start_date, end_date, interval
+
+def _get_cached_value(hashsum, func_get_value, columns=None, origin=None):
+    """Cached value, DataFrames are stored in columnar memory-mapped files.
+
+    Only columns are read from cached DataFrame, the whole frame is cached.
+    origin is saved with DataFrame and shown by cache_admin.
+    """
+    frame_path = get_frame_path(hashsum, TEMP_FOLDER)
+    if os.path.exists(frame_path):
+        # mtime is used for eviction, atime is not reliable on most mounts
+        os.utime(frame_path)
+        return read_frame(frame_path, columns)
+
+    legacy_path = _get_legacy_path(hashsum)
+    if legacy_path:
+        os.utime(legacy_path)
+        value = get_cached_value(hashsum, func_get_value, TEMP_FOLDER)
+    else:
+        value = func_get_value()
+        if is_supported_frame(value):
+            write_frame(frame_path, value, {ORIGIN: origin} if origin else None)
+        else:
+            value = get_cached_value(hashsum, lambda: value, TEMP_FOLDER)
+
+    if columns is not None and isinstance(value, pd.DataFrame):
+        value = select_frame(value, columns)
+    return value
+
+
+_DATA_PROVIDER = YahooProvider(max_connections=ISIN_LOOKUP_CONCURRENCY)
+
+
+def set_data_provider(provider: DataProvider):
+    """Provider used by get_history and _get_symbols, also in process workers."""
+    global _DATA_PROVIDER
+    _DATA_PROVIDER = provider
+
+
+def get_data_provider() -> DataProvider:
+    return _DATA_PROVIDER
+
+
+def _get_history_store():
+    return HistoryStore(
+        os.path.join(TEMP_FOLDER, HISTORY_FOLDER, get_data_provider().name)
     )
 
-    df = _get_cached_value(
-        hashsum,
-        lambda: yf.download(
-            symbols,
-            interval=interval,
-            start=start_date,
-            end=end_date,
-            group_by="ticker",
-        ),
+
+def _download_history(symbols, start_date, end_date, interval):
+    return get_data_provider().get_history(symbols, start_date, end_date, interval)
+
+
+def _update_history(
+    symbols,
+    start_date,
+    end_date,
+    interval,
+    batch_size=DOWNLOAD_BATCH_SIZE,
+    concurrency=DOWNLOAD_CONCURRENCY,
+):
+    _get_history_store().update(
+        symbols,
+        start_date,
+        end_date,
+        interval,
+        _download_history,
+        batch_size,
+        concurrency,
     )
 
-    return df
+
+def get_history(
+    symbols,
+    start_date,
+    end_date,
+    interval,
+    batch_size=DOWNLOAD_BATCH_SIZE,
+    concurrency=DOWNLOAD_CONCURRENCY,
+):
+    _update_history(symbols, start_date, end_date, interval, batch_size, concurrency)
+
+    store = _get_history_store()
+
+    histories = {
+        symbol: store.get(symbol, start_date, end_date, interval) for symbol in symbols
+    }
+    if len(set(symbols)) == 1:
+        return histories[symbols[0]]
+
+    return pd.concat(histories, axis=1)
 
 
 def get_date_column_name(df):
@@ -107,26 +250,34 @@ def get_date_column_name(df):
         return Column.DATETIME
 
 
+def _get_calendar_features(df_date):
+    if not pd.api.types.is_datetime64_any_dtype(df_date):
+        df_date = pd.to_datetime(df_date)
+
+    dt = df_date.dt
+    return pd.DataFrame(
+        {
+            Column.YEAR: dt.year.astype(np.int16),
+            Column.MONTH: dt.month.astype(np.int8),
+            Column.DAY: dt.day.astype(np.int8),
+            Column.HOUR: dt.hour.astype(np.int8),
+            Column.MINUTE: dt.minute.astype(np.int8),
+            Column.DAY_NAME: dt.day_name(),
+            Column.MONTH_NAME: dt.month_name(),
+            Column.WEEKDAY: dt.weekday.astype(np.int8),
+            Column.WEEK: dt.isocalendar().week.astype(np.int8),
+        },
+        index=df_date.index,
+    )
+
+
 def update_dataframe(df, symbol, set_base_value=False):
     df = df.reset_index()
 
     date_column = get_date_column_name(df)
-    df_date = df[date_column]
-    for component in [
-        Column.YEAR,
-        Column.MONTH,
-        Column.DAY,
-        Column.HOUR,
-        Column.MINUTE,
-    ]:
-        df[component] = df_date.apply(lambda x: getattr(x, component))
-
-    df[Column.DAY_NAME] = df_date.apply(lambda x: x.day_name())
-    df[Column.MONTH_NAME] = df_date.apply(lambda x: x.month_name())
-
-    # DateTimeIndex as x for some data??
-    df[Column.WEEKDAY] = [t.weekday() for t in df_date.tolist()]
-    df[Column.WEEK] = [t.isocalendar()[1] for t in df_date.tolist()]
+    df_calendar = _get_calendar_features(df[date_column])
+    for column in df_calendar.columns:
+        df[column] = df_calendar[column]
 
     # Filteting NA in Open - this means usually a dividends
     if not df.empty:
@@ -143,15 +294,16 @@ def update_dataframe(df, symbol, set_base_value=False):
     return df
 
 
+def _get_symbol_table():
+    return SymbolTable(
+        os.path.join(TEMP_FOLDER, f"isin_symbols_{get_data_provider().name}.json")
+    )
+
+
 def __get_symbol(isin):
-    url = f"https://query2.finance.yahoo.com/v1/finance/search?q={isin}&quotesCount=1&newsCount=0"
-    r = requests.get(url, headers={"User-agent": "Mozilla/5.0"})
-    if r.status_code == 200:
-        quotes = r.json().get("quotes")
-        if quotes:
-            symbol = quotes[0].get("symbol")
-            if symbol:
-                return symbol
+    symbol = get_data_provider().get_symbol(isin)
+    if symbol:
+        return symbol
 
     logger.debug(f"Symbol not found for {isin}")
     return None
@@ -164,19 +316,9 @@ def _get_symbols(filename, limit):
     elif Column.ISIN in df.columns:
         isins = df[Column.ISIN].tolist()
 
-        def __get_symbols_from_yf():
-            symbols = []
-            for isin in isins:
-                symbol = __get_symbol(isin)
-                if symbol:
-                    symbols.append(symbol)
-
-                if limit and len(symbols) >= limit:
-                    break
-            return symbols
-
-        hashsum = _get_hashsum(_get_symbols.__name__, *(isins + [str(limit)]))
-        symbols = _get_cached_value(hashsum, __get_symbols_from_yf)
+        symbols = _get_symbol_table().resolve(
+            isins, __get_symbol, limit, ISIN_LOOKUP_CONCURRENCY
+        )
 
         assert symbols, f"Symbols not found {isins}"
     else:
@@ -188,103 +330,313 @@ def _get_symbols(filename, limit):
     return symbols
 
 
-def wrapper(filename: str, yahoo_range: YahooRange, limit, func, interval: str = "1d"):
-    def __get_symbols_nested():
-        start_date, end_date = [
-            _format_datetime(d) for d in _get_start_and_end_dates(yahoo_range)
-        ]
-        symbols = _get_symbols(filename, limit)
+def _init_process_worker(provider, temp_folder):
+    # workers started by spawn or forkserver don't inherit globals of parent
+    global TEMP_FOLDER
+    TEMP_FOLDER = temp_folder
+    set_data_provider(provider)
+
+
+def _map(func, items, executor=Executor.THREAD):
+    """Results of func for items in the same order, yielded lazily."""
+    if executor == Executor.THREAD:
+        yield from concurrent_map(func, items)
+    elif executor == Executor.PROCESS:
+        # analysis functions hold GIL - threads are not enough for them
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+            initializer=_init_process_worker,
+            initargs=(get_data_provider(), TEMP_FOLDER),
+        ) as pool:
+            chunksize = max(1, len(items) // (workers * 4))
+            yield from pool.map(func, items, chunksize=chunksize)
+    elif executor == Executor.SERIAL:
+        yield from (func(item) for item in items)
+    else:
+        raise ValueError(f"Unsupported executor: {executor}")
 
-        history_data = get_history(symbols, start_date, end_date, interval)
-        if len(set(symbols)) == 1:
-            symbols_with_history = [
-                {Column.SYMBOL: symbols[0], Column.HISTORY: history_data}
-            ]
-        else:
-            symbols_with_history = [
-                {Column.SYMBOL: symbol, Column.HISTORY: history_data[symbol]}
-                for symbol in history_data.columns.get_level_values(0)
-                .unique()
-                .to_list()
-                if (
-                    not history_data.empty
-                    and not history_data[
-                        history_data[symbol][Column.OPEN].notna()
-                    ].empty
-                )
-            ]
-
-        dfs = [df for df in concurrent_map(func, symbols_with_history) if not df.empty]
-        if dfs:
-            symbols_dfs = pd.concat(dfs, ignore_index=True)
-
-            assert not symbols_dfs.isna().any().any()
-
-            symbols_dfs[Column.PERCENT] = symbols_dfs[Column.PERCENT] * 100
-
-            symbols_dfs = symbols_dfs.convert_dtypes()
-        else:
-            symbols_dfs = pd.DataFrame()
-        return symbols_dfs
 
+def _apply_result_schema(df, symbols):
+    """Compact dtypes for result of single symbol.
+
+    Symbol is categorical with all symbols as categories, so results of
+    different symbols are concatenated without converting it to object.
+    """
+    assert not df.isna().any().any()
+
+    df = df.astype(
+        {column: dtype for column, dtype in RESULT_SCHEMA.items() if column in df}
+    )
+    if Column.SYMBOL in df:
+        codes = df[Column.SYMBOL].map({s: i for i, s in enumerate(symbols)})
+        df[Column.SYMBOL] = pd.Categorical.from_codes(codes, categories=symbols)
+
+    return df
+
+
+def _get_symbol_diffs(
+    symbol,
+    func,
+    start_date,
+    end_date,
+    interval,
+    symbols,
+    code_fingerprint,
+    columns=None,
+    aggregate_by=None,
+):
+    # history is read from store by symbol, so in process mode only symbol
+    # name is sent to worker, not the whole history
+    store = _get_history_store()
+
+    def __get_symbol_diffs_nested():
+        history_data = store.get(symbol, start_date, end_date, interval)
+        if history_data.empty or history_data[Column.OPEN].isna().all():
+            return pd.DataFrame()
+
+        return func({Column.SYMBOL: symbol, Column.HISTORY: history_data})
+
+    # result is recomputed when analysis code or history of symbol changes
     hashsum = _get_hashsum(
         wrapper.__name__,
+        get_data_provider().name,
         func.__module__,
         func.__name__,
-        filename,
-        yahoo_range,
-        limit,
+        code_fingerprint,
+        symbol,
+        start_date,
+        end_date,
         interval,
+        store.get_version(symbol, start_date, end_date, interval),
     )
-    logger.debug(
-        "Hashsum for {}: {}",
-        (
-            wrapper.__name__,
-            func.__module__,
-            func.__name__,
-            filename,
-            yahoo_range,
-            limit,
-            interval,
-        ),
+    df = _get_cached_value(
         hashsum,
+        __get_symbol_diffs_nested,
+        columns=columns,
+        origin=f"{func.__module__}.{func.__name__}",
     )
-    symbols_dfs = _get_cached_value(
-        hashsum,
-        __get_symbols_nested,
+    if df.empty:
+        return df
+
+    df[Column.PERCENT] = df[Column.PERCENT] * 100
+    df = _apply_result_schema(df, symbols)
+    if aggregate_by is not None:
+        # only stats per key are sent back from worker
+        return get_stats(df, aggregate_by, Column.PERCENT)
+
+    return df
+
+
+def _get_result_cube(
+    func,
+    start_date,
+    end_date,
+    interval,
+    symbols,
+    code_fingerprint,
+    bucket,
+    get_symbols_dfs,
+):
+    # result_cube imports common
+    from stocks.buy_sell_analysis.result_cube import ResultCube
+
+    store = _get_history_store()
+    # cube is rebuilt when analysis code or history of any symbol changes,
+    # results of symbols are not computed if cube is cached
+    hashsum = _get_hashsum(
+        _get_result_cube.__name__,
+        get_data_provider().name,
+        func.__module__,
+        func.__name__,
+        code_fingerprint,
+        start_date,
+        end_date,
+        interval,
+        bucket,
+        [
+            (symbol, store.get_version(symbol, start_date, end_date, interval))
+            for symbol in symbols
+        ],
     )
 
-    return symbols_dfs
+    def __get_result_cube():
+        df = get_symbols_dfs()
+        assert not df.empty, f"No results of {func.__name__}"
+        return ResultCube.from_frame(df, bucket)
+
+    return _get_cached_value(
+        hashsum, __get_result_cube, origin=f"{func.__module__}.{func.__name__}"
+    )
+
+
+def _evict_cache():
+    evict(TEMP_FOLDER, CACHE_MAX_MB * 2**20, CACHE_MAX_DAYS * 24 * 60 * 60)
+
+
+def _get_formatted_dates(yahoo_range: YahooRange):
+    return [_format_datetime(d) for d in _get_start_and_end_dates(yahoo_range)]
+
+
+def get_missing_history(filename: str, yahoo_range: YahooRange, limit, interval):
+    """Symbols from filename and symbols which history has to be downloaded."""
+    start_date, end_date = _get_formatted_dates(yahoo_range)
+    symbols = list(dict.fromkeys(_get_symbols(filename, limit)))
+
+    symbols_per_range = _get_history_store().get_symbols_per_range(
+        symbols, start_date, end_date, interval
+    )
+    missing_symbols = {s for r in symbols_per_range.values() for s in r}
+
+    return symbols, missing_symbols
+
+
+def prefetch_history(filename: str, yahoo_range: YahooRange, limit, interval):
+    start_date, end_date = _get_formatted_dates(yahoo_range)
+    symbols = list(dict.fromkeys(_get_symbols(filename, limit)))
+
+    _update_history(symbols, start_date, end_date, interval)
+
+
+def wrapper(
+    filename: str,
+    yahoo_range: YahooRange,
+    limit,
+    func,
+    interval: str = "1d",
+    executor=Executor.THREAD,
+    aggregate_by=None,
+    cube_by=None,
+):
+    """Results of func for all symbols from filename.
+
+    With aggregate_by column results of every symbol are folded into running
+    stats as symbols finish, so frame of all symbols is never built. Result
+    is then indexed by aggregate_by values with mean, variance and count of
+    percent.
+
+    With cube_by column ResultCube with cube_by buckets is returned. Cube is
+    cached once per analysis run, so repeated queries only slice it.
+    """
+    start_date, end_date = _get_formatted_dates(yahoo_range)
+    symbols = list(dict.fromkeys(_get_symbols(filename, limit)))
+
+    _update_history(symbols, start_date, end_date, interval)
+
+    code_fingerprint = get_code_fingerprint(func)
+    # only columns needed by aggregation or cube are read from cache
+    columns = None
+    if aggregate_by is not None:
+        columns = [aggregate_by, Column.PERCENT]
+    elif cube_by is not None:
+        columns = [Column.SYMBOL, Column.YEAR, cube_by, Column.PERCENT]
+    results = _map(
+        partial(
+            _get_symbol_diffs,
+            func=func,
+            start_date=start_date,
+            end_date=end_date,
+            interval=interval,
+            symbols=symbols,
+            code_fingerprint=code_fingerprint,
+            columns=columns,
+            aggregate_by=aggregate_by,
+        ),
+        symbols,
+        executor,
+    )
+    if aggregate_by is not None:
+        running_stats = RunningStats()
+        for stats in results:
+            running_stats.update(stats)
+        _evict_cache()
+        return running_stats.result(Column.PERCENT, Column.VARIANCE, Column.COUNT)
+
+    def __get_symbols_dfs():
+        dfs = [df for df in results if not df.empty]
+        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+    if cube_by is not None:
+        value = _get_result_cube(
+            func,
+            start_date,
+            end_date,
+            interval,
+            symbols,
+            code_fingerprint,
+            cube_by,
+            __get_symbols_dfs,
+        )
+    else:
+        value = __get_symbols_dfs()
+
+    _evict_cache()
+    return value
+
+
+def get_plot_summary(data, x, y, ci=95):
+    """Mean and bootstrap CI of y per x, cached by content of data."""
+    hashsum = _get_hashsum(
+        get_plot_summary.__name__,
+        x,
+        y,
+        ci,
+        int(pd.util.hash_pandas_object(data[[x, y]], index=False).sum()),
+    )
+
+    def __get_plot_summary():
+        df = get_confidence_intervals(data[x].to_numpy(), data[y].to_numpy(), ci)
+        return df.rename_axis(x).reset_index()
+
+    return _get_cached_value(
+        hashsum, __get_plot_summary, origin=get_plot_summary.__name__
+    )
 
 
 def plot(**kwargs):
+    # plotting libraries are slow to import and not needed for analysis
+    from matplotlib import pyplot
+    from seaborn import barplot, boxplot, lineplot, scatterplot
+
     plot_ci = 95
 
     funcs = [boxplot, barplot, scatterplot, lineplot]
-    # NOTE: after lineplot X will be float
 
     data = kwargs["data"]
     x = kwargs["x"]
     y = kwargs["y"]
     Y = data[y]
-    print(kwargs["data"][[x, y]].groupby(x).mean().head())
+    # seaborn would bootstrap raw data on every plot
+    df_summary = get_plot_summary(data, x, y, plot_ci)
+    mean = df_summary[MEAN]
+    print(df_summary.head())
 
     fig, axs = pyplot.subplots(nrows=len(funcs), figsize=(15, 20))
 
     for i, func in enumerate(funcs):
         ax = axs[i]
 
-        if func == lineplot:
-            data[x] = data[x].astype(float)
-            kwargs["ci"] = plot_ci
-        elif func == barplot:
-            kwargs["ci"] = plot_ci
-
-        ax = func(**kwargs, ax=ax)
         if func == barplot:
+            ax = barplot(x=x, y=MEAN, data=df_summary, ci=None, ax=ax)
+            ax.errorbar(
+                range(len(df_summary)),
+                mean,
+                yerr=[mean - df_summary[CI_LOW], df_summary[CI_HIGH] - mean],
+                fmt="none",
+                ecolor="black",
+            )
+            ax.set_ylabel(y)
             y_q2 = Y.quantile(0.93)
             y_q1 = Y.quantile(0.10)
             ax.set_ylim(y_q1, y_q2)
+        elif func == lineplot:
+            X = df_summary[x].astype(float)
+            ax = lineplot(x=X, y=mean, ci=None, ax=ax)
+            ax.fill_between(X, df_summary[CI_LOW], df_summary[CI_HIGH], alpha=0.2)
+            ax.set_ylabel(y)
+        else:
+            ax = func(**kwargs, ax=ax)
 
     fig.tight_layout()
 
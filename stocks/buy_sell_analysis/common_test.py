@@ -1,14 +1,22 @@
+import os
+import subprocess
+import sys
 from datetime import datetime
 
+import numpy as np
+import pytest
 from dateutil.relativedelta import relativedelta
 
-from stocks.buy_sell_analysis import analysis, analysis_base_first_date
+from stocks.buy_sell_analysis import analysis, analysis_base_first_date, common
 from stocks.buy_sell_analysis.common import (
+    Column,
+    Executor,
     YahooRange,
     _format_datetime,
     _get_start_and_end_dates,
     _get_symbols,
 )
+from stocks.buy_sell_analysis.providers import SyntheticProvider
 
 
 def test_get_range_10years():
@@ -68,3 +76,105 @@ def test_cached_df_from_different_files():
             "dax/dax_mdax_sdax.csv", YahooRange.YEARS_2, limit=limit
         )
     )
+
+
+def test_heavy_modules_are_not_imported():
+    # -X importtime lists every module imported by common
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {common.__name__}"],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {line.split("|")[-1].strip() for line in result.stderr.splitlines()[1:]}
+
+    for module in ["matplotlib", "seaborn", "yfinance", "requests"]:
+        assert module not in modules, f"{module} is imported with {common.__name__}"
+
+
+def test_process_executor_with_spawn(monkeypatch, tmp_path):
+    provider = SyntheticProvider()
+    symbols_path = str(tmp_path / "symbols.csv")
+    provider.save_symbols(symbols_path, 3)
+
+    monkeypatch.setattr(common, "TEMP_FOLDER", str(tmp_path / "cache"))
+    monkeypatch.setattr(common, "PROCESS_START_METHOD", "spawn")
+    monkeypatch.setattr(common, "_DATA_PROVIDER", provider)
+
+    df_thread = analysis.get_best_month(
+        symbols_path, YahooRange.YEARS_20, executor=Executor.THREAD
+    )
+    # results are computed again by workers
+    monkeypatch.setattr(common, "TEMP_FOLDER", str(tmp_path / "process_cache"))
+    df_process = analysis.get_best_month(
+        symbols_path, YahooRange.YEARS_20, executor=Executor.PROCESS
+    )
+
+    assert not df_process.empty
+    assert df_process.equals(df_thread)
+    assert len(os.listdir(tmp_path / "process_cache")) > 0
+
+
+def test_cached_values_which_are_not_dataframes(monkeypatch, tmp_path):
+    monkeypatch.setattr(common, "TEMP_FOLDER", str(tmp_path))
+    calls = []
+
+    def get_value():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    assert common._get_legacy_path("hashsum") is None
+    assert common._get_cached_value("hashsum", get_value) == {"value": 1}
+    assert common._get_legacy_path("hashsum") is not None
+    assert common._get_cached_value("hashsum", get_value) == {"value": 1}
+    assert len(calls) == 1
+
+
+def test_result_cube_is_cached(monkeypatch, tmp_path):
+    provider = SyntheticProvider()
+    symbols_path = str(tmp_path / "symbols.csv")
+    provider.save_symbols(symbols_path, 3)
+    monkeypatch.setattr(common, "TEMP_FOLDER", str(tmp_path / "cache"))
+    monkeypatch.setattr(common, "_DATA_PROVIDER", provider)
+
+    df = analysis.get_best_month(symbols_path, YahooRange.YEARS_2)
+    cube = analysis.get_best_month(
+        symbols_path, YahooRange.YEARS_2, cube_by=Column.MONTH
+    )
+    expected = df.groupby(Column.MONTH)[Column.PERCENT].mean()
+    assert cube.get_means().to_numpy() == pytest.approx(expected.to_numpy())
+
+    calls = []
+    monkeypatch.setattr(common, "_get_symbol_diffs", lambda *a, **k: calls.append(1))
+    cube = analysis.get_best_month(
+        symbols_path, YahooRange.YEARS_2, cube_by=Column.MONTH
+    )
+    assert cube.get_means().to_numpy() == pytest.approx(expected.to_numpy())
+    assert not calls
+
+
+def test_result_schema(monkeypatch, tmp_path):
+    provider = SyntheticProvider()
+    symbols_path = str(tmp_path / "symbols.csv")
+    provider.save_symbols(symbols_path, 3)
+    monkeypatch.setattr(common, "TEMP_FOLDER", str(tmp_path / "cache"))
+    monkeypatch.setattr(common, "_DATA_PROVIDER", provider)
+
+    df = analysis.get_best_month(symbols_path, YahooRange.YEARS_2)
+    assert df.dtypes.to_dict() == {
+        Column.YEAR: np.int16,
+        Column.MONTH: np.int8,
+        Column.SYMBOL: "category",
+        Column.PERCENT: np.float32,
+    }
+
+    df_stats = analysis.get_best_month(
+        symbols_path, YahooRange.YEARS_2, aggregate_by=Column.MONTH
+    )
+    monkeypatch.setitem(common.RESULT_SCHEMA, Column.PERCENT, np.float64)
+    df_float64 = analysis.get_best_month(symbols_path, YahooRange.YEARS_2)
+    expected = df_float64.groupby(Column.MONTH)[Column.PERCENT].mean()
+    assert df_stats[Column.PERCENT].to_numpy() == pytest.approx(
+        expected.to_numpy(), rel=np.finfo(np.float32).eps
+    )
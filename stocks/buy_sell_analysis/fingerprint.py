@@ -0,0 +1,63 @@
+import hashlib
+import inspect
+import types
+
+PACKAGE = "stocks"
+
+
+def _is_package_object(value):
+    return (
+        isinstance(value, (types.FunctionType, type))
+        and value.__module__.split(".")[0] == PACKAGE
+    )
+
+
+def _get_dependencies(code, func_globals):
+    """Package functions and classes which are used by code as globals."""
+    for name in code.co_names:
+        value = func_globals.get(name)
+        if _is_package_object(value):
+            yield value
+
+    # nested functions and lambdas
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _get_dependencies(const, func_globals)
+
+
+def _get_source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        # e.g. defined in interactive session
+        return obj.__code__.co_code.hex() if hasattr(obj, "__code__") else repr(obj)
+
+
+def get_code_fingerprint(func):
+    """Hash of func source and sources of all package code it depends on.
+
+    Dependencies are collected recursively from globals of functions, so
+    editing any helper which func calls changes the fingerprint.
+    """
+    sources = {}
+    objs = [func]
+    while objs:
+        obj = objs.pop()
+        name = f"{obj.__module__}.{obj.__qualname__}"
+        if name in sources:
+            continue
+
+        sources[name] = _get_source(obj)
+        functions = [obj] if isinstance(obj, types.FunctionType) else []
+        if isinstance(obj, type):
+            functions = [
+                v for v in vars(obj).values() if isinstance(v, types.FunctionType)
+            ]
+        for function in functions:
+            objs.extend(_get_dependencies(function.__code__, function.__globals__))
+
+    hashsum = hashlib.sha1()
+    for name in sorted(sources):
+        hashsum.update(name.encode("utf8"))
+        hashsum.update(sources[name].encode("utf8"))
+    return hashsum.hexdigest()
@@ -0,0 +1,26 @@
+import sys
+
+from stocks.buy_sell_analysis.fingerprint import get_code_fingerprint
+
+
+def _get_value():
+    return 1
+
+
+def _get_other_value():
+    return 2
+
+
+def _get_result():
+    return _get_value() + 1
+
+
+def test_fingerprint_is_stable():
+    assert get_code_fingerprint(_get_result) == get_code_fingerprint(_get_result)
+    assert get_code_fingerprint(_get_result) != get_code_fingerprint(_get_value)
+
+
+def test_fingerprint_changes_with_dependency(monkeypatch):
+    fingerprint = get_code_fingerprint(_get_result)
+    monkeypatch.setattr(sys.modules[__name__], "_get_value", _get_other_value)
+    assert get_code_fingerprint(_get_result) != fingerprint
@@ -1,21 +1,23 @@
 import calendar
 import sys
 
+import numpy as np
+import pandas as pd
 from loguru import logger
 from pandas.core.frame import DataFrame
 from stocks.buy_sell_analysis import analysis, analysis_base_first_date
-from stocks.buy_sell_analysis.common import (
-    Column,
-    YahooRange,
-    _get_cached_value,
-    _get_hashsum,
-)
+from stocks.buy_sell_analysis.common import Column, YahooRange
 
 logger.remove()
 logger.add(sys.stdout, level="WARNING")
 
 
-def __get_data(filename, analysis_module, limit):
+def __get_data(filename, analysis_module, limit, streaming=False):
+    """Mean percent per key for every analysis.
+
+    In streaming mode results of symbols are aggregated as they finish,
+    so the frame of all symbols is never built.
+    """
     data_to_collect = [
         (Column.MONTH, analysis_module.get_best_month, YahooRange.YEARS_20),
         (Column.DAY, analysis_module.get_best_month_day, YahooRange.YEARS_20),
@@ -26,25 +28,17 @@ def __get_data(filename, analysis_module, limit):
         (Column.QUARTER, analysis_module.get_best_quarter, YahooRange.DAYS_58),
     ]
 
-    module_name = analysis_module.__name__
-
     data = []
     for column, func, yrange in data_to_collect:
-        hashsum = _get_hashsum(
-            __get_data.__name__, module_name, func.__name__, filename, yrange, limit
-        )
-        logger.info(f"{column}, {func.__name__}, {yrange} hashum: {hashsum}")
-        data.append(
-            (
-                column,
-                _get_cached_value(
-                    hashsum,
-                    lambda: func(filename, yrange, limit),
-                ),
-            )
-        )
+        # results of symbols are cached by wrapper with code and history versions
+        logger.info(f"{column}, {func.__name__}, {yrange}")
+        if streaming:
+            df = func(filename, yrange, limit, aggregate_by=column)
+            data.append((column, df[[Column.PERCENT]]))
+        else:
+            df = func(filename, yrange, limit)
+            data.append((column, df[[column, Column.PERCENT]].groupby(column).mean()))
 
-    data = [(k, df[[k, Column.PERCENT]].groupby(k).mean()) for k, df in data]
     return dict(data)
 
 
@@ -61,37 +55,33 @@ def __format_value(key, value):
     return value
 
 
+def __get_signs(dfs):
+    # sign of change to previous point, rows - datasets, columns - points
+    df_signs = (
+        pd.concat(
+            [np.sign(df[Column.PERCENT].diff()) for df in dfs],
+            axis=1,
+            ignore_index=True,
+        )
+        .sort_index()
+        .T
+    )
+    # key is in index not in column!
+    return df_signs.columns.tolist(), df_signs.to_numpy(dtype=float)
+
+
 def __get_stats(*data, module_name=None, filename=None):
     assert len(data) > 0
 
     stats = []
     for key in data[0].keys():
-        dfs = [d.get(key) for d in data]
-        points_go_down = []
-        points_go_up = []
-
-        for df in dfs:
-            prev_value = None
-            df_point_go_down = set()
-            df_point_go_up = set()
-            for _, row in df.iterrows():
-                cur_value = row[Column.PERCENT]
-                if prev_value is None:
-                    prev_value = cur_value
-                    continue
-                else:
-                    # key is in index not in column!
-                    point = row.name
-
-                    if cur_value < prev_value:
-                        df_point_go_down.add(point)
-                    elif cur_value > prev_value:
-                        df_point_go_up.add(point)
-
-                    prev_value = cur_value
-
-            points_go_down.append(df_point_go_down)
-            points_go_up.append(df_point_go_up)
+        points, signs = __get_signs([d.get(key) for d in data])
+        points = np.array(points)
+
+        points_go_up = signs > 0
+        points_go_down = signs < 0
+        # -1 - all datasets go down, 1 - all datasets go up
+        agreement = (points_go_up.sum(axis=0) - points_go_down.sum(axis=0)) / len(data)
 
         stats.append(
             {
@@ -99,13 +89,15 @@ def __get_stats(*data, module_name=None, filename=None):
                 # "module": module_name.split(".")[-1] if module_name else None,
                 "type": key,
                 "down": [
-                    __format_value(key, v)
-                    for v in sorted(set.intersection(*points_go_down))
+                    __format_value(key, v) for v in points[points_go_down.all(axis=0)]
                 ]
                 or None,
-                "up": [
-                    __format_value(key, v)
-                    for v in sorted(set.intersection(*points_go_up))
+                "up": [__format_value(key, v) for v in points[points_go_up.all(axis=0)]]
+                or None,
+                "agreement": [
+                    (__format_value(key, v), a)
+                    for v, a in zip(points, agreement)
+                    if a != 0
                 ]
                 or None,
             }
@@ -118,18 +110,22 @@ def print_stats(stats):
     func_to_str = lambda x: ", ".join([str(v) for v in x]) if x else None
     df["up"] = df["up"].apply(func_to_str)
     df["down"] = df["down"].apply(func_to_str)
+    df["agreement"] = df["agreement"].apply(
+        lambda x: ", ".join([f"{v} {a:+.2f}" for v, a in x]) if x else None
+    )
     print(df.to_markdown())
     print()
 
 
 if __name__ == "__main__":
     limit = None
+    streaming = True
 
     data = []
     for filename in ["sp500/sp500.csv", "dax/dax_mdax_sdax.csv"]:
         data_per_file = []
         for analysis_module in [analysis, analysis_base_first_date]:
-            d = __get_data(filename, analysis_module, limit)
+            d = __get_data(filename, analysis_module, limit, streaming)
             data_per_file.append(d)
 
             print(f"Module {analysis_module.__name__}, file {filename}")
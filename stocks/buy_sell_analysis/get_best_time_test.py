@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from stocks.buy_sell_analysis import get_best_time
+from stocks.buy_sell_analysis.common import Column
+
+
+def __get_data(percents):
+    df = pd.DataFrame(
+        {Column.PERCENT: percents}, index=pd.Index([1, 2, 3, 4], name=Column.QUARTER)
+    )
+    return {Column.QUARTER: df}
+
+
+def test_agreement_of_datasets():
+    data = [
+        __get_data([1.0, 2.0, 1.0, 0.0]),
+        __get_data([1.0, 2.0, 3.0, 2.0]),
+        __get_data([1.0, 3.0, 2.0, 1.0]),
+    ]
+
+    (stats,) = get_best_time.__get_stats(*data)
+
+    assert stats["type"] == Column.QUARTER
+    assert stats["up"] == [2]
+    assert stats["down"] == [4]
+    # first point has no previous one, so no agreement
+    points, agreement = zip(*stats["agreement"])
+    assert points == (2, 3, 4)
+    assert agreement == pytest.approx([1.0, -1 / 3, -1.0])
+
+
+def test_no_agreement():
+    data = [__get_data([1.0, 2.0, 1.0, 2.0]), __get_data([1.0, 0.0, 2.0, 1.0])]
+
+    (stats,) = get_best_time.__get_stats(*data)
+
+    assert stats["up"] is None
+    assert stats["down"] is None
+    assert stats["agreement"] is None
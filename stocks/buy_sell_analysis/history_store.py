@@ -0,0 +1,314 @@
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+DAILY_INTERVAL = "1d"
+
+# Yahoo weekly bars start on Monday, monthly bars on first day of month
+RESAMPLE_RULES = {"1wk": "W-MON", "1mo": "MS"}
+RESAMPLE_AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+}
+
+
+def _format_date(date):
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+def slice_history(df, start_date, end_date):
+    if df.empty:
+        return df
+
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if df.index.tz is not None:
+        start, end = start.tz_localize(df.index.tz), end.tz_localize(df.index.tz)
+
+    return df[(df.index >= start) & (df.index < end)]
+
+
+def _split_by_symbol(df, symbols):
+    if df is None or df.empty:
+        return {symbol: None for symbol in symbols}
+
+    if isinstance(df.columns, pd.MultiIndex):
+        downloaded = set(df.columns.get_level_values(0))
+        return {
+            symbol: df[symbol].dropna(how="all") if symbol in downloaded else None
+            for symbol in symbols
+        }
+    else:
+        assert len(symbols) == 1, f"Expected data for single symbol: {symbols}"
+        return {symbols[0]: df.dropna(how="all")}
+
+
+def get_source_interval(interval):
+    """Interval which has to be downloaded to get bars for interval."""
+    return DAILY_INTERVAL if interval in RESAMPLE_RULES else interval
+
+
+def resample_history(df, interval):
+    """Build weekly or monthly OHLC bars from daily bars."""
+    if df.empty:
+        return df
+
+    aggregations = {
+        column: RESAMPLE_AGGREGATIONS.get(column, "last") for column in df.columns
+    }
+    df_resampled = df.resample(
+        RESAMPLE_RULES[interval], label="left", closed="left"
+    ).agg(aggregations)
+
+    return df_resampled[df_resampled["Open"].notna()]
+
+
+_VERSION_DTYPE = [("time", "i8"), ("hash", "u8")]
+
+
+def _get_local_times(index):
+    # dates of requested ranges are compared with local time like in slice_history
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy(dtype="datetime64[ns]").view("i8")
+
+
+def get_row_versions(df):
+    """Time and cumulative content hash of every bar, sum of hashes of bars
+    in any range is difference of two cumulative hashes.
+    """
+    versions = np.empty(df.shape[0], dtype=_VERSION_DTYPE)
+    if not df.empty:
+        versions["time"] = _get_local_times(df.index)
+        # uint64 sum wraps around on overflow
+        versions["hash"] = np.cumsum(pd.util.hash_pandas_object(df).to_numpy())
+    return versions
+
+
+def get_range_version(versions, start_date, end_date):
+    """Number and content hash of bars in range, changes with any added or
+    updated bar in range, bars outside of range don't change it.
+    """
+    start, end = np.searchsorted(
+        versions["time"],
+        np.array([start_date, end_date], dtype="datetime64[ns]").view("i8"),
+    )
+    hashes = versions["hash"]
+    total = int(hashes[end - 1]) if end else 0
+    before = int(hashes[start - 1]) if start else 0
+    return f"{end - start}-{(total - before) % 2**64:016x}"
+
+
+class HistoryStore(object):
+    """Append-only local price history per symbol and interval.
+
+    Every symbol keeps its bars in one file plus a small json file with the
+    covered date range and the last bar. Only the missing head or tail of
+    requested range is downloaded, everything else is read from disk.
+    Weekly and monthly bars are built from daily bars if they cover
+    requested range.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _get_path(self, symbol, interval, extension):
+        filename = symbol.replace(os.sep, "_")
+        return os.path.join(self.folder, interval, f"{filename}.{extension}")
+
+    def get_coverage(self, symbol, interval):
+        path = self._get_path(symbol, interval, "json")
+        # history without row versions is downloaded again
+        if not os.path.exists(path) or not os.path.exists(
+            self._get_path(symbol, interval, "npy")
+        ):
+            return None
+
+        with open(path, mode="r") as f:
+            return json.load(f)
+
+    def read(self, symbol, interval):
+        path = self._get_path(symbol, interval, "pkl")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+
+        # histories which are not read are evicted by cache_admin
+        os.utime(path)
+        return pd.read_pickle(path)
+
+    def _replace(self, path, write):
+        # readers (e.g. process workers) never see partially written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def write(self, symbol, interval, df, coverage):
+        """Bars, row versions and coverage are replaced atomically one by one.
+
+        Coverage is replaced last, so it never claims bars which are not
+        saved yet.
+        """
+        path = self._get_path(symbol, interval, "pkl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._replace(path, df.to_pickle)
+
+        def __save_versions(tmp_path):
+            with open(tmp_path, mode="wb") as f:
+                np.save(f, get_row_versions(df))
+
+        self._replace(self._get_path(symbol, interval, "npy"), __save_versions)
+
+        coverage["last"] = _format_date(df.index.max()) if not df.empty else None
+
+        def __save_coverage(tmp_path):
+            with open(tmp_path, mode="w") as f:
+                json.dump(coverage, f)
+
+        self._replace(self._get_path(symbol, interval, "json"), __save_coverage)
+
+    def get_version(self, symbol, start_date, end_date, interval):
+        """Version of history which get returns for the same arguments.
+
+        Only row versions are read, not history itself.
+        """
+        if self.can_resample(symbol, start_date, end_date, interval):
+            interval = DAILY_INTERVAL
+
+        if self.get_coverage(symbol, interval) is None:
+            return None
+
+        path = self._get_path(symbol, interval, "npy")
+        return get_range_version(np.load(path, mmap_mode="r"), start_date, end_date)
+
+    def covers(self, symbol, start_date, end_date, interval):
+        coverage = self.get_coverage(symbol, interval)
+        return (
+            coverage is not None
+            and coverage["start"] <= start_date
+            and end_date <= coverage["end"]
+        )
+
+    def can_resample(self, symbol, start_date, end_date, interval):
+        return interval in RESAMPLE_RULES and self.covers(
+            symbol, start_date, end_date, DAILY_INTERVAL
+        )
+
+    def get_missing_ranges(self, symbol, start_date, end_date, interval):
+        coverage = self.get_coverage(symbol, interval)
+        if coverage is None:
+            return [(start_date, end_date)]
+
+        ranges = []
+        if start_date < coverage["start"]:
+            ranges.append((start_date, coverage["start"]))
+        if end_date > coverage["end"]:
+            # last bar might be incomplete - download it again
+            tail_start = min(coverage["end"], coverage["last"] or coverage["end"])
+            ranges.append((max(start_date, tail_start), end_date))
+
+        return ranges
+
+    def get_symbols_per_range(self, symbols, start_date, end_date, interval):
+        """Symbols grouped by date range which is missing in store."""
+        symbols_per_range = defaultdict(list)
+        for symbol in symbols:
+            if self.can_resample(symbol, start_date, end_date, interval):
+                continue
+
+            for date_range in self.get_missing_ranges(
+                symbol, start_date, end_date, interval
+            ):
+                symbols_per_range[date_range].append(symbol)
+
+        return symbols_per_range
+
+    def update(
+        self,
+        symbols,
+        start_date,
+        end_date,
+        interval,
+        download,
+        batch_size=100,
+        concurrency=1,
+    ):
+        """Download missing history in batches of batch_size symbols.
+
+        Up to concurrency batches are downloaded at the same time, every batch
+        is written to store and released before next one is requested.
+        Symbols of failed batches and symbols without data stay missing and
+        are downloaded again by next update.
+        """
+        symbols_per_range = self.get_symbols_per_range(
+            symbols, start_date, end_date, interval
+        )
+
+        # ranges are processed one by one - same symbol might be in head and tail
+        for (start, end), range_symbols in symbols_per_range.items():
+            batches = [
+                range_symbols[i : i + batch_size]
+                for i in range(0, len(range_symbols), batch_size)
+            ]
+            logger.debug(
+                f"Downloading {interval} {start} - {end} for {len(range_symbols)} "
+                f"symbols in {len(batches)} batches"
+            )
+
+            def __download_batch(batch):
+                try:
+                    df = download(batch, start, end, interval)
+                except Exception as e:
+                    # other batches are saved, failed one stays missing
+                    logger.warning(f"Failed to download {interval} {batch}: {e}")
+                    return
+
+                for symbol, df_symbol in _split_by_symbol(df, batch).items():
+                    self.append(symbol, interval, df_symbol, start, end)
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(__download_batch, batches))
+
+    def append(self, symbol, interval, df_new, start_date, end_date):
+        if df_new is None or df_new.empty:
+            # e.g. failed or throttled download - range is not covered, so it
+            # is downloaded again next time
+            logger.warning(
+                f"No {interval} history of {symbol} {start_date} - {end_date}"
+            )
+            return
+
+        df = self.read(symbol, interval)
+        if not df.empty:
+            df = pd.concat([df, df_new])
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+        else:
+            df = df_new
+
+        coverage = self.get_coverage(symbol, interval)
+        if coverage is None or start_date > coverage["end"]:
+            coverage = {"start": start_date, "end": end_date}
+        else:
+            coverage = {
+                "start": min(start_date, coverage["start"]),
+                "end": max(end_date, coverage["end"]),
+            }
+
+        self.write(symbol, interval, df, coverage)
+
+    def get(self, symbol, start_date, end_date, interval):
+        if self.can_resample(symbol, start_date, end_date, interval):
+            return resample_history(
+                self.get(symbol, start_date, end_date, DAILY_INTERVAL), interval
+            )
+
+        return slice_history(self.read(symbol, interval), start_date, end_date)
@@ -0,0 +1,232 @@
+import os
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.history_store import HistoryStore, resample_history
+
+INTERVAL = "1d"
+
+
+def __download(calls):
+    def download(symbols, start_date, end_date, interval):
+        calls.append((tuple(symbols), start_date, end_date))
+        index = pd.date_range(start_date, end_date, freq="B", inclusive="left")
+        return pd.concat(
+            {
+                symbol: pd.DataFrame(
+                    {"Open": np.arange(index.shape[0], dtype=float)},
+                    index=index.rename("Date"),
+                )
+                for symbol in symbols
+            },
+            axis=1,
+        )
+
+    return download
+
+
+def test_only_missing_tail_is_downloaded():
+    calls = []
+    symbols = ["AAA", "BBB"]
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(symbols, "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        store.update(symbols, "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        assert len(calls) == 1
+
+        store.update(symbols, "2020-01-01", "2020-03-01", INTERVAL, __download(calls))
+        assert calls[-1] == (tuple(symbols), "2020-01-31", "2020-03-01")
+
+        df = store.get("AAA", "2020-01-01", "2020-03-01", INTERVAL)
+        assert df.index.is_unique
+        assert df.index.min() == pd.Timestamp("2020-01-01")
+        assert df.index.max() == pd.Timestamp("2020-02-28")
+
+
+def test_new_symbol_downloads_full_range():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        store.update(
+            ["AAA", "BBB"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls)
+        )
+        assert calls[-1] == (("BBB",), "2020-01-01", "2020-02-01")
+
+
+def test_window_is_sliced_from_store():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2019-01-01", "2021-01-01", INTERVAL, __download(calls))
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        assert len(calls) == 1
+
+        df = store.get("AAA", "2020-01-01", "2020-02-01", INTERVAL)
+        assert df.index.min() >= pd.Timestamp("2020-01-01")
+        assert df.index.max() < pd.Timestamp("2020-02-01")
+
+
+def test_empty_download_is_not_covered():
+    calls = []
+    download = __download(calls)
+
+    def download_nothing(symbols, start_date, end_date, interval):
+        calls.append((tuple(symbols), start_date, end_date))
+        return pd.DataFrame()
+
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, download_nothing)
+        assert store.get_missing_ranges(
+            "AAA", "2020-01-01", "2020-02-01", INTERVAL
+        ) == [("2020-01-01", "2020-02-01")]
+
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, download)
+        assert len(calls) == 2
+        assert not store.get("AAA", "2020-01-01", "2020-02-01", INTERVAL).empty
+
+
+def test_download_in_batches():
+    calls = []
+    symbols = [f"S{i}" for i in range(10)]
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(
+            symbols,
+            "2020-01-01",
+            "2020-02-01",
+            INTERVAL,
+            __download(calls),
+            batch_size=3,
+            concurrency=2,
+        )
+        assert sorted(len(symbols) for symbols, _, _ in calls) == [1, 3, 3, 3]
+        for symbol in symbols:
+            assert not store.get(symbol, "2020-01-01", "2020-02-01", INTERVAL).empty
+
+
+def test_failed_batches_stay_missing():
+    calls = []
+    download = __download(calls)
+    symbols = [f"S{i}" for i in range(9)]
+
+    def download_with_errors(batch, start_date, end_date, interval):
+        if "S0" in batch:
+            raise IOError("429 Too Many Requests")
+        if "S3" in batch:
+            return pd.DataFrame()
+        # S8 is not returned
+        return download([s for s in batch if s != "S8"], start_date, end_date, interval)
+
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(
+            symbols,
+            "2020-01-01",
+            "2020-02-01",
+            INTERVAL,
+            download_with_errors,
+            batch_size=3,
+            concurrency=2,
+        )
+        missing = store.get_symbols_per_range(
+            symbols, "2020-01-01", "2020-02-01", INTERVAL
+        )
+        assert missing == {
+            ("2020-01-01", "2020-02-01"): ["S0", "S1", "S2", "S3", "S4", "S5", "S8"]
+        }
+
+        store.update(symbols, "2020-01-01", "2020-02-01", INTERVAL, download)
+        assert calls[-1] == (
+            ("S0", "S1", "S2", "S3", "S4", "S5", "S8"),
+            "2020-01-01",
+            "2020-02-01",
+        )
+        for symbol in symbols:
+            assert not store.get(symbol, "2020-01-01", "2020-02-01", INTERVAL).empty
+
+
+def test_resample_weekly_and_monthly():
+    index = pd.date_range("2021-01-04", "2021-02-26", freq="B", name="Date")
+    df = pd.DataFrame(
+        {
+            "Open": np.arange(index.shape[0], dtype=float),
+            "High": np.arange(index.shape[0], dtype=float) + 1,
+            "Volume": np.ones(index.shape[0]),
+        },
+        index=index,
+    )
+
+    df_week = resample_history(df, "1wk")
+    assert df_week.index[0] == pd.Timestamp("2021-01-04")
+    assert (df_week.index.weekday == 0).all()
+    assert df_week["Open"].tolist()[:2] == [0, 5]
+    assert df_week["High"].tolist()[:2] == [5, 10]
+    assert (df_week["Volume"] == 5).all()
+
+    df_month = resample_history(df, "1mo")
+    assert df_month.index.tolist() == [
+        pd.Timestamp("2021-01-01"),
+        pd.Timestamp("2021-02-01"),
+    ]
+    assert df_month["Open"].tolist() == [0, 20]
+
+
+def test_weekly_history_from_daily_store():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2020-01-01", "2020-03-01", "1d", __download(calls))
+        store.update(["AAA"], "2020-01-01", "2020-03-01", "1wk", __download(calls))
+        assert len(calls) == 1
+
+        df = store.get("AAA", "2020-01-01", "2020-03-01", "1wk")
+        assert not df.empty
+        assert (df.index.weekday == 0).all()
+
+
+def test_version_changes_with_history():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        version = store.get_version("AAA", "2020-01-01", "2020-02-01", INTERVAL)
+        assert version is not None
+
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        assert store.get_version("AAA", "2020-01-01", "2020-02-01", INTERVAL) == version
+        head_version = store.get_version("AAA", "2020-01-01", "2020-01-15", INTERVAL)
+
+        store.update(["AAA"], "2020-01-01", "2020-03-01", INTERVAL, __download(calls))
+        assert store.get_version("AAA", "2020-01-01", "2020-03-01", INTERVAL) != version
+        # new and updated bars are outside of range
+        assert (
+            store.get_version("AAA", "2020-01-01", "2020-01-15", INTERVAL)
+            == head_version
+        )
+        # weekly bars are resampled from daily ones
+        assert store.get_version(
+            "AAA", "2020-01-01", "2020-03-01", "1wk"
+        ) == store.get_version("AAA", "2020-01-01", "2020-03-01", INTERVAL)
+
+
+def test_history_without_versions_is_missing():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        store = HistoryStore(tmp_dir)
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        os.remove(store._get_path("AAA", INTERVAL, "npy"))
+
+        assert store.get_version("AAA", "2020-01-01", "2020-02-01", INTERVAL) is None
+        assert store.get_missing_ranges(
+            "AAA", "2020-01-01", "2020-02-01", INTERVAL
+        ) == [("2020-01-01", "2020-02-01")]
+
+        store.update(["AAA"], "2020-01-01", "2020-02-01", INTERVAL, __download(calls))
+        assert len(calls) == 2
+        assert (
+            store.get_version("AAA", "2020-01-01", "2020-02-01", INTERVAL) is not None
+        )
@@ -0,0 +1,288 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from threading import Lock
+from zlib import crc32
+
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.history_store import (
+    DAILY_INTERVAL,
+    get_source_interval,
+    resample_history,
+    slice_history,
+)
+
+
+class DataProvider(ABC):
+    """Source of price history and ISIN -> symbol lookups."""
+
+    name = None
+
+    @abstractmethod
+    def get_history(self, symbols, start_date, end_date, interval):
+        """DataFrame with (symbol, OHLC column) MultiIndex columns."""
+
+    @abstractmethod
+    def get_symbol(self, isin):
+        """Symbol for ISIN or None if not found.
+
+        Failed lookups (e.g. HTTP 429) raise, they are not saved as not found.
+        """
+
+
+class YahooProvider(DataProvider):
+    name = "yahoo"
+
+    def __init__(self, max_connections=None):
+        # None - default pool size of requests
+        self.max_connections = max_connections
+        self._session = None
+        self._session_lock = Lock()
+
+    def __getstate__(self):
+        # sent to process workers, session and lock can't be pickled
+        return {"max_connections": self.max_connections}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _get_session(self):
+        # network libraries are imported only when data is not in store
+        import requests
+        from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+        # one pooled session for concurrent ISIN lookups
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers["User-agent"] = "Mozilla/5.0"
+                pool_size = self.max_connections or DEFAULT_POOLSIZE
+                session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+                self._session = session
+
+        return self._session
+
+    def get_history(self, symbols, start_date, end_date, interval):
+        import yfinance as yf
+
+        return yf.download(
+            symbols,
+            interval=interval,
+            start=start_date,
+            end=end_date,
+            group_by="ticker",
+        )
+
+    def get_symbol(self, isin):
+        url = f"https://query2.finance.yahoo.com/v1/finance/search?q={isin}&quotesCount=1&newsCount=0"
+        r = self._get_session().get(url)
+        # e.g. rate limit, only answer without quotes means not found
+        r.raise_for_status()
+        quotes = r.json().get("quotes")
+        if quotes:
+            symbol = quotes[0].get("symbol")
+            if symbol:
+                return symbol
+
+        return None
+
+
+def _parse_dates(values, timezone):
+    # intraday dates are saved with UTC offset which changes with DST
+    if re.search(r"[+-]\d\d:\d\d$", str(values[0])):
+        return pd.to_datetime(values, utc=True).tz_convert(timezone or "UTC")
+    return pd.to_datetime(values)
+
+
+class FileProvider(DataProvider):
+    """History from local files: {folder}/{interval}/{symbol}.csv
+
+    First column of every file is date, ISIN lookups are read from
+    {folder}/symbols.csv with ISIN and Symbol columns. Dates with UTC offset
+    are converted to timezone.
+    """
+
+    name = "file"
+
+    def __init__(self, folder, timezone=None):
+        self.folder = folder
+        self.timezone = timezone
+
+    def _get_path(self, symbol, interval):
+        return os.path.join(self.folder, interval, f"{symbol}.csv")
+
+    def save(self, symbol, interval, df):
+        path = self._get_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path)
+
+    def get_history(self, symbols, start_date, end_date, interval):
+        histories = {}
+        for symbol in symbols:
+            path = self._get_path(symbol, interval)
+            if os.path.exists(path):
+                df = pd.read_csv(path, index_col=0)
+                df.index = _parse_dates(df.index, self.timezone)
+                histories[symbol] = slice_history(df, start_date, end_date)
+
+        return pd.concat(histories, axis=1) if histories else pd.DataFrame()
+
+    def get_symbol(self, isin):
+        path = os.path.join(self.folder, "symbols.csv")
+        if not os.path.exists(path):
+            return None
+
+        df = pd.read_csv(path)
+        symbols = df[df["ISIN"] == isin]["Symbol"].tolist()
+        return symbols[0] if symbols else None
+
+
+class TradingCalendar(object):
+    def __init__(self, timezone, open_time, close_time, holidays=()):
+        self.timezone = timezone
+        self.open_time = pd.Timedelta(open_time)
+        self.close_time = pd.Timedelta(close_time)
+        self.holidays = pd.DatetimeIndex(holidays)
+
+    def get_days(self, start_date, end_date):
+        days = pd.date_range(start_date, end_date, freq="B", inclusive="left")
+        return days[~days.isin(self.holidays)]
+
+
+TradingCalendar.NYSE = TradingCalendar("America/New_York", "09:30:00", "16:00:00")
+TradingCalendar.XETRA = TradingCalendar("Europe/Berlin", "09:00:00", "17:30:00")
+
+
+def _get_interval_minutes(interval):
+    match = re.fullmatch(r"(\d+)(m|h)", interval)
+    assert match, f"Unsupported interval: {interval}"
+
+    value, unit = int(match.group(1)), match.group(2)
+    return value * 60 if unit == "h" else value
+
+
+def _get_noise(symbol_key, keys, salt):
+    """Deterministic standard normal noise for int64 keys (splitmix64)."""
+    with np.errstate(over="ignore"):
+        values = []
+        for i in range(2):
+            x = keys.astype(np.uint64) + np.uint64(symbol_key * 4 + salt * 2 + i)
+            x = x * np.uint64(0x9E3779B97F4A7C15)
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            x = x ^ (x >> np.uint64(31))
+            values.append((x >> np.uint64(11)).astype(np.float64) / 2.0**53)
+
+    # Box-Muller
+    u1, u2 = values
+    return np.sqrt(-2 * np.log(1 - u1)) * np.cos(2 * np.pi * u2)
+
+
+class SyntheticProvider(DataProvider):
+    """Deterministic generated OHLC history.
+
+    Daily price level is random walk from EPOCH seeded by seed and symbol,
+    so the same bar always has the same price for any requested range.
+    Intraday bars are generated for trading hours of calendar.
+    """
+
+    name = "synthetic"
+    EPOCH = pd.Timestamp("1990-01-01")
+
+    def __init__(
+        self,
+        seed=0,
+        calendar=TradingCalendar.NYSE,
+        daily_volatility=0.02,
+        intraday_volatility=0.003,
+    ):
+        self.seed = seed
+        self.calendar = calendar
+        self.daily_volatility = daily_volatility
+        self.intraday_volatility = intraday_volatility
+
+    def get_symbols(self, count):
+        return [f"SYN{i:05d}" for i in range(count)]
+
+    def save_symbols(self, path, count):
+        pd.DataFrame({"Symbol": self.get_symbols(count)}).to_csv(path, index=False)
+
+    def get_symbol(self, isin):
+        return f"SYN-{isin}"
+
+    def _get_symbol_key(self, symbol):
+        return crc32(f"{self.seed}:{symbol}".encode("utf8"))
+
+    def _get_daily_levels(self, symbol_key, end_date):
+        days = (pd.Timestamp(end_date) - self.EPOCH).days + 1
+        rng = np.random.default_rng(symbol_key)
+        start_price = rng.uniform(10, 500)
+        drift = rng.uniform(-0.0002, 0.0005)
+        # first values don't depend on number of days
+        returns = rng.normal(drift, self.daily_volatility, days)
+        return np.log(start_price) + np.cumsum(returns)
+
+    def _get_index(self, start_date, end_date, interval):
+        days = self.calendar.get_days(start_date, end_date)
+        if interval == DAILY_INTERVAL:
+            return days.rename("Date")
+
+        minutes = _get_interval_minutes(interval)
+        offsets = pd.timedelta_range(
+            self.calendar.open_time,
+            self.calendar.close_time,
+            freq=f"{minutes}min",
+            closed="left",
+        )
+        index = (days.values[:, None] + offsets.values[None, :]).ravel()
+        return pd.DatetimeIndex(index, name="Datetime").tz_localize(
+            self.calendar.timezone
+        )
+
+    def _get_symbol_history(self, symbol, index, end_date):
+        symbol_key = self._get_symbol_key(symbol)
+        levels = self._get_daily_levels(symbol_key, end_date)
+
+        naive_index = index.tz_localize(None) if index.tz is not None else index
+        day_numbers = (naive_index.normalize() - self.EPOCH).days.values
+        keys = ((naive_index - self.EPOCH) // pd.Timedelta(minutes=1)).values
+
+        log_open = levels[day_numbers] + self.intraday_volatility * _get_noise(
+            symbol_key, keys, 0
+        )
+        log_close = log_open + self.intraday_volatility * _get_noise(
+            symbol_key, keys, 1
+        )
+        spread = self.intraday_volatility * np.abs(_get_noise(symbol_key, keys, 2))
+
+        price_open, price_close = np.exp(log_open), np.exp(log_close)
+        return pd.DataFrame(
+            {
+                "Open": price_open,
+                "High": np.maximum(price_open, price_close) * (1 + spread),
+                "Low": np.minimum(price_open, price_close) * (1 - spread),
+                "Close": price_close,
+                "Adj Close": price_close,
+                "Volume": (1e6 * np.exp(_get_noise(symbol_key, keys, 3))).astype(
+                    np.int64
+                ),
+            },
+            index=index,
+        )
+
+    def get_history(self, symbols, start_date, end_date, interval):
+        assert pd.Timestamp(start_date) >= self.EPOCH, f"Dates before {self.EPOCH}"
+
+        source_interval = get_source_interval(interval)
+        index = self._get_index(start_date, end_date, source_interval)
+
+        histories = {}
+        for symbol in symbols:
+            df = self._get_symbol_history(symbol, index, end_date)
+            if source_interval != interval:
+                df = resample_history(df, interval)
+            histories[symbol] = df
+
+        return pd.concat(histories, axis=1)
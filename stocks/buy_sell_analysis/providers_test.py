@@ -0,0 +1,97 @@
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+import pytest
+import requests
+
+from stocks.buy_sell_analysis.providers import (
+    DataProvider,
+    FileProvider,
+    SyntheticProvider,
+    TradingCalendar,
+    YahooProvider,
+)
+
+SYMBOLS = ["AAA", "BBB"]
+
+
+def test_synthetic_history_is_deterministic():
+    provider = SyntheticProvider(seed=1)
+    df = provider.get_history(SYMBOLS, "2020-01-01", "2020-03-01", "1d")
+    df_tail = SyntheticProvider(seed=1).get_history(
+        SYMBOLS, "2020-02-01", "2020-04-01", "1d"
+    )
+
+    assert df.columns.get_level_values(0).unique().tolist() == SYMBOLS
+    assert not df.isna().any().any()
+    pd.testing.assert_frame_equal(
+        df.loc["2020-02-01":], df_tail.loc[:"2020-02-29"], check_freq=False
+    )
+    assert not df["AAA"]["Open"].equals(df["BBB"]["Open"])
+    assert not df.equals(
+        SyntheticProvider(seed=2).get_history(SYMBOLS, "2020-01-01", "2020-03-01", "1d")
+    )
+
+
+def test_synthetic_intraday_calendar():
+    provider = SyntheticProvider(calendar=TradingCalendar.XETRA)
+    df = provider.get_history(["AAA"], "2023-01-02", "2023-01-09", "15m")["AAA"]
+
+    assert df.index.tz is not None
+    assert sorted(set(df.index.weekday)) == [0, 1, 2, 3, 4]
+    assert df.index.min().hour == 9
+    assert (df.index.max().hour, df.index.max().minute) == (17, 15)
+    assert (df["High"] >= df[["Open", "Close"]].max(axis=1)).all()
+    assert (df["Low"] <= df[["Open", "Close"]].min(axis=1)).all()
+
+
+def test_synthetic_monthly_history():
+    provider = SyntheticProvider()
+    df = provider.get_history(["AAA"], "2020-01-01", "2021-01-01", "1mo")["AAA"]
+    assert df.shape[0] == 12
+
+
+def test_file_provider():
+    df = SyntheticProvider().get_history(SYMBOLS, "2023-01-02", "2023-01-09", "60m")
+    with TemporaryDirectory() as tmp_dir:
+        provider = FileProvider(tmp_dir, timezone=TradingCalendar.NYSE.timezone)
+        for symbol in SYMBOLS:
+            provider.save(symbol, "60m", df[symbol])
+
+        df_read = provider.get_history(SYMBOLS, "2023-01-02", "2023-01-09", "60m")
+        assert df_read.shape == df.shape
+        assert df_read.index.tz is not None
+        assert (df_read.index == df.index).all()
+        assert provider.get_symbol("DE0007164600") is None
+
+
+class __Session(object):
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    def get(self, url):
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = url
+        response._content = self.content
+        return response
+
+
+def test_yahoo_symbol_lookup_errors_are_raised():
+    provider = YahooProvider()
+    provider._session = __Session(200, b'{"quotes": []}')
+    assert provider.get_symbol("DE0007164600") is None
+
+    provider._session = __Session(429, b"Too Many Requests")
+    with pytest.raises(requests.HTTPError):
+        provider.get_symbol("DE0007164600")
+
+
+def test_provider_has_to_implement_all_methods():
+    class HistoryOnlyProvider(DataProvider):
+        def get_history(self, symbols, start_date, end_date, interval):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        HistoryOnlyProvider()
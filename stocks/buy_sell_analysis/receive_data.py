@@ -1,25 +1,96 @@
-from common import YahooRange
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from tqdm import tqdm
 
 from stocks.buy_sell_analysis import analysis, analysis_base_first_date
+from stocks.buy_sell_analysis.common import (
+    INTERVALS,
+    Column,
+    YahooRange,
+    get_missing_history,
+    prefetch_history,
+)
+from stocks.buy_sell_analysis.history_store import get_source_interval
+
+FILENAMES = ["sp500/sp500.csv", "dax/dax_mdax_sdax.csv"]
+MODULES = [analysis, analysis_base_first_date]
+# interval of analysis is INTERVALS[column], the same as get_best_* use
+FUNCTIONS = [
+    ("get_best_month", YahooRange.YEARS_20, Column.MONTH),
+    ("get_best_week", YahooRange.YEARS_20, Column.WEEK),
+    ("get_best_month_day", YahooRange.YEARS_20, Column.DAY),
+    ("get_best_weekday", YahooRange.YEARS_20, Column.WEEKDAY),
+    ("get_best_hour", YahooRange.YEARS_2, Column.HOUR),
+    ("get_best_time", YahooRange.DAYS_58, Column.TIME),
+    ("get_best_quarter", YahooRange.DAYS_58, Column.QUARTER),
+]
+
+
+def __plan_history(filenames, limit):
+    # weekly and monthly bars are built from daily history
+    needs = list(
+        dict.fromkeys(
+            (filename, get_source_interval(INTERVALS[column]), yrange)
+            for filename in filenames
+            for _, yrange, column in FUNCTIONS
+        )
+    )
+
+    plan = []
+    for filename, interval, yrange in needs:
+        symbols, missing_symbols = get_missing_history(
+            filename, yrange, limit, interval
+        )
+        plan.append((filename, interval, yrange, symbols, missing_symbols))
+
+    return plan
+
+
+def __print_plan(plan, analysis_count):
+    total = sum(len(symbols) for _, _, _, symbols, _ in plan)
+    missing = sum(len(missing) for _, _, _, _, missing in plan)
+    for filename, interval, yrange, symbols, missing_symbols in plan:
+        print(
+            f"{filename} {interval} {yrange.name}: {len(symbols)} symbols, "
+            f"{len(symbols) - len(missing_symbols)} cached, "
+            f"{len(missing_symbols)} to download"
+        )
+    print(
+        f"Planned {len(plan)} histories for {analysis_count} analyses: "
+        f"{total} symbol histories, {total - missing} cached, {missing} to download"
+    )
+
+
+def __prefetch_history(plan, limit):
+    # same interval is downloaded sequentially - it shares store files
+    needs_per_interval = defaultdict(list)
+    for filename, interval, yrange, _, missing_symbols in plan:
+        if missing_symbols:
+            needs_per_interval[interval].append((filename, yrange))
+
+    def __prefetch_interval(interval):
+        for filename, yrange in needs_per_interval[interval]:
+            prefetch_history(filename, yrange, limit, interval)
+
+    with ThreadPoolExecutor() as pool:
+        list(pool.map(__prefetch_interval, needs_per_interval))
+
 
 if __name__ == "__main__":
     # Receive all data and save it to tmp folder - cache it
     limit = None
-    args = []
-    for filename in ["sp500/sp500.csv", "dax/dax_mdax_sdax.csv"]:
-        for module in [analysis, analysis_base_first_date]:
-            for func, range in [
-                ("get_best_month", YahooRange.YEARS_20),
-                ("get_best_week", YahooRange.YEARS_20),
-                ("get_best_month_day", YahooRange.YEARS_20),
-                ("get_best_weekday", YahooRange.YEARS_20),
-                ("get_best_hour", YahooRange.YEARS_2),
-                ("get_best_time", YahooRange.DAYS_58),
-                ("get_best_quarter", YahooRange.DAYS_58),
-            ]:
-                args.append((filename, module, func, range))
-
-    for filename, module, func, range in tqdm(args):
-        df = getattr(module, func)(filename, range, limit=limit)
+    args = [
+        (filename, module, func, yrange)
+        for filename in FILENAMES
+        for module in MODULES
+        for func, yrange, _ in FUNCTIONS
+    ]
+
+    plan = __plan_history(FILENAMES, limit)
+    __print_plan(plan, len(args))
+    __prefetch_history(plan, limit)
+
+    for filename, module, func, yrange in tqdm(args):
+        df = getattr(module, func)(filename, yrange, limit=limit)
         assert not df.empty
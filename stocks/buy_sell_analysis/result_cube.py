@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.common import Column
+
+_AXES = [Column.SYMBOL, Column.YEAR]
+
+
+class ResultCube(object):
+    """Sums and counts of percent with axes symbol x year x bucket.
+
+    Built once from result of analysis, e.g.
+
+        cube = ResultCube.from_frame(get_best_month(...), Column.MONTH)
+        cube.select(symbols=dax_symbols, years=range(2015, 2025)).get_means()
+
+    Queries only slice and sum arrays, results are not grouped again.
+    """
+
+    def __init__(self, bucket, symbols, years, buckets, sums, counts):
+        self.bucket = bucket
+        self.labels = {
+            Column.SYMBOL: np.asarray(symbols, dtype=str),
+            Column.YEAR: np.asarray(years),
+            bucket: np.asarray(buckets),
+        }
+        self.sums = sums
+        self.counts = counts
+
+    @classmethod
+    def from_frame(cls, df, bucket, value=Column.PERCENT):
+        symbols = pd.Categorical(df[Column.SYMBOL])
+        symbols = symbols.remove_unused_categories()
+        years, year_codes = np.unique(df[Column.YEAR].to_numpy(), return_inverse=True)
+        buckets, bucket_codes = np.unique(df[bucket].to_numpy(), return_inverse=True)
+
+        shape = (len(symbols.categories), len(years), len(buckets))
+        flat = np.ravel_multi_index((symbols.codes, year_codes, bucket_codes), shape)
+        size = np.prod(shape)
+        counts = np.bincount(flat, minlength=size).reshape(shape)
+        sums = np.bincount(
+            flat, weights=df[value].to_numpy(np.float64), minlength=size
+        ).reshape(shape)
+
+        return cls(bucket, symbols.categories, years, buckets, sums, counts)
+
+    @property
+    def axes(self):
+        return _AXES + [self.bucket]
+
+    def _get_indexes(self, axis, values):
+        labels = self.labels[axis]
+        if values is None:
+            return np.arange(len(labels))
+
+        return np.flatnonzero(np.isin(labels, list(values)))
+
+    def select(self, symbols=None, years=None, buckets=None):
+        """Cube with only given symbols, years and buckets."""
+        indexes = [
+            self._get_indexes(axis, values)
+            for axis, values in zip(self.axes, [symbols, years, buckets])
+        ]
+        grid = np.ix_(*indexes)
+        return ResultCube(
+            self.bucket,
+            *[self.labels[axis][i] for axis, i in zip(self.axes, indexes)],
+            self.sums[grid],
+            self.counts[grid],
+        )
+
+    def get_means(self, by=None):
+        """Mean percent per bucket (or per symbol / year), NaN without data."""
+        by = by or self.bucket
+        axis = self.axes.index(by)
+        other_axes = tuple(i for i in range(len(self.axes)) if i != axis)
+
+        sums = self.sums.sum(axis=other_axes)
+        counts = self.counts.sum(axis=other_axes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+
+        return pd.Series(
+            means, index=pd.Index(self.labels[by], name=by), name=Column.PERCENT
+        )
+
+    def save(self, path):
+        np.savez(
+            path,
+            bucket=self.bucket,
+            sums=self.sums,
+            counts=self.counts,
+            **{f"labels_{i}": self.labels[axis] for i, axis in enumerate(self.axes)},
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            labels = [data[f"labels_{i}"] for i in range(len(_AXES) + 1)]
+            return cls(str(data["bucket"]), *labels, data["sums"], data["counts"])
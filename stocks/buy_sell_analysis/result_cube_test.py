@@ -0,0 +1,59 @@
+import os
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.common import Column
+from stocks.buy_sell_analysis.result_cube import ResultCube
+
+
+def __get_df():
+    rng = np.random.default_rng(0)
+    size = 1000
+    return pd.DataFrame(
+        {
+            Column.YEAR: rng.integers(2010, 2020, size),
+            Column.MONTH: rng.integers(1, 13, size),
+            Column.SYMBOL: pd.Categorical(rng.choice(["A", "B", "C"], size)),
+            Column.PERCENT: rng.normal(0, 1, size),
+        }
+    )
+
+
+def test_means_equal_to_grouped_frame():
+    df = __get_df()
+    cube = ResultCube.from_frame(df, Column.MONTH)
+
+    expected = df.groupby(Column.MONTH)[Column.PERCENT].mean()
+    np.testing.assert_allclose(cube.get_means(), expected)
+
+    expected = df.groupby(Column.SYMBOL)[Column.PERCENT].mean()
+    np.testing.assert_allclose(cube.get_means(Column.SYMBOL), expected)
+
+
+def test_select():
+    df = __get_df()
+    cube = ResultCube.from_frame(df, Column.MONTH)
+
+    df_selected = df[df[Column.SYMBOL].isin(["A", "C"]) & (df[Column.YEAR] >= 2015)]
+    expected = df_selected.groupby(Column.MONTH)[Column.PERCENT].mean()
+    means = cube.select(symbols=["A", "C"], years=range(2015, 2020)).get_means()
+    np.testing.assert_allclose(means, expected)
+
+    means = cube.select(buckets=[1, 2]).get_means(Column.YEAR)
+    assert means.index.tolist() == list(range(2010, 2020))
+
+
+def test_save_and_load():
+    cube = ResultCube.from_frame(__get_df(), Column.MONTH)
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cube.npz")
+        cube.save(path)
+        loaded = ResultCube.load(path)
+
+    assert loaded.bucket == Column.MONTH
+    pd.testing.assert_series_equal(loaded.get_means(), cube.get_means())
+    pd.testing.assert_series_equal(
+        loaded.get_means(Column.SYMBOL), cube.get_means(Column.SYMBOL)
+    )
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+COUNT = "count"
+MEAN = "mean"
+M2 = "m2"
+
+
+def get_stats(df, key, value):
+    """Count, mean and M2 (sum of squared differences from mean) per key."""
+    values = df[value].astype(np.float64)
+    grouped = values.groupby(df[key].values)
+    count = grouped.count()
+    return pd.DataFrame(
+        {
+            COUNT: count,
+            MEAN: grouped.mean(),
+            M2: grouped.var(ddof=0).fillna(0) * count,
+        }
+    ).rename_axis(key)
+
+
+def merge_stats(stats_a, stats_b):
+    """Merge per key stats of two parts (Chan et al. parallel algorithm)."""
+    index = stats_a.index.union(stats_b.index)
+    a = stats_a.reindex(index, fill_value=0)
+    b = stats_b.reindex(index, fill_value=0)
+
+    count = a[COUNT] + b[COUNT]
+    delta = b[MEAN] - a[MEAN]
+    return pd.DataFrame(
+        {
+            COUNT: count,
+            MEAN: a[MEAN] + delta * b[COUNT] / count,
+            M2: a[M2] + b[M2] + delta**2 * a[COUNT] * b[COUNT] / count,
+        },
+        index=index,
+    ).rename_axis(stats_a.index.name or stats_b.index.name)
+
+
+class RunningStats(object):
+    """Running mean and variance per key, parts are folded as they arrive."""
+
+    def __init__(self):
+        self.stats = None
+
+    def update(self, stats):
+        if stats.empty:
+            return
+
+        self.stats = stats if self.stats is None else merge_stats(self.stats, stats)
+
+    def result(self, mean_column, variance_column, count_column):
+        if self.stats is None:
+            return pd.DataFrame()
+
+        return pd.DataFrame(
+            {
+                mean_column: self.stats[MEAN],
+                variance_column: self.stats[M2] / (self.stats[COUNT] - 1),
+                count_column: self.stats[COUNT],
+            }
+        ).sort_index()
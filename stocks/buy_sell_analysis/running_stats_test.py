@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from stocks.buy_sell_analysis.running_stats import RunningStats, get_stats
+
+
+def __get_df():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "Symbol": np.repeat(["A", "B", "C"], 20),
+            "month": rng.integers(1, 13, 60),
+            "Percent (mean)": rng.normal(0, 1, 60).astype("float32"),
+        }
+    )
+
+
+def test_running_stats_equal_to_stats_of_whole_frame():
+    df = __get_df()
+
+    running_stats = RunningStats()
+    for _, df_symbol in df.groupby("Symbol"):
+        running_stats.update(get_stats(df_symbol, "month", "Percent (mean)"))
+    result = running_stats.result("mean", "variance", "count")
+
+    grouped = df["Percent (mean)"].astype(float).groupby(df["month"])
+    np.testing.assert_allclose(result["mean"], grouped.mean())
+    np.testing.assert_allclose(result["variance"], grouped.var())
+    np.testing.assert_array_equal(result["count"], grouped.count())
+
+
+def test_running_stats_without_parts():
+    running_stats = RunningStats()
+    running_stats.update(pd.DataFrame())
+    assert running_stats.result("mean", "variance", "count").empty
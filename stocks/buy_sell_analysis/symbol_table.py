@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+NEGATIVE_TTL = 7 * 24 * 60 * 60
+
+
+class SymbolTable(object):
+    """Persistent ISIN -> symbol table.
+
+    ISINs without symbol are remembered for negative_ttl seconds, ISINs with
+    symbol never expire.
+    """
+
+    def __init__(self, path, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.table = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path, mode="r") as f:
+            return json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.table, f)
+        os.replace(tmp_path, self.path)
+
+    def is_known(self, isin):
+        entry = self.table.get(isin)
+        if entry is None:
+            return False
+
+        return (
+            entry["symbol"] is not None
+            or time.time() - entry["time"] < self.negative_ttl
+        )
+
+    def get(self, isin):
+        entry = self.table.get(isin)
+        return entry["symbol"] if entry else None
+
+    def set(self, isin, symbol):
+        self.table[isin] = {"symbol": symbol, "time": time.time()}
+
+    def _get_known_symbols(self, isins):
+        symbols = []
+        for isin in isins:
+            if not self.is_known(isin):
+                break
+
+            symbol = self.get(isin)
+            if symbol:
+                symbols.append(symbol)
+        return symbols
+
+    def resolve(self, isins, get_symbol, limit=None, concurrency=8):
+        """Symbols for ISINs in the same order, unknown ISINs are looked up.
+
+        Lookups run concurrently in chunks and stop as soon as there are
+        enough symbols for limit.
+        """
+        pending = [isin for isin in dict.fromkeys(isins) if not self.is_known(isin)]
+        chunk_size = concurrency * 4
+
+        def __get_symbol(isin):
+            try:
+                return get_symbol(isin)
+            except Exception as e:
+                # not saved - will be looked up next time
+                logger.warning(f"Failed to get symbol for {isin}: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for i in range(0, len(pending), chunk_size):
+                if limit and len(self._get_known_symbols(isins)) >= limit:
+                    break
+
+                chunk = pending[i : i + chunk_size]
+                for isin, symbol in zip(chunk, pool.map(__get_symbol, chunk)):
+                    if not isinstance(symbol, Exception):
+                        self.set(isin, symbol)
+                self.save()
+
+        symbols = [self.get(isin) for isin in isins]
+        symbols = [symbol for symbol in symbols if symbol]
+        return symbols[:limit] if limit else symbols
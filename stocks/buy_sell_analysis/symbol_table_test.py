@@ -0,0 +1,61 @@
+import os
+from tempfile import TemporaryDirectory
+
+from stocks.buy_sell_analysis.symbol_table import SymbolTable
+
+ISINS = [f"DE{i:010d}" for i in range(20)]
+
+
+def __get_symbol(calls):
+    def get_symbol(isin):
+        calls.append(isin)
+        # every 5th ISIN is not found
+        return None if int(isin[2:]) % 5 == 0 else f"S{isin[-2:]}"
+
+    return get_symbol
+
+
+def test_only_new_isins_are_resolved():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "isins.json")
+        symbols = SymbolTable(path).resolve(ISINS[:10], __get_symbol(calls))
+        assert len(symbols) == 8
+        assert len(calls) == 10
+
+        symbols = SymbolTable(path).resolve(ISINS, __get_symbol(calls))
+        assert len(symbols) == 16
+        assert sorted(calls[10:]) == ISINS[10:]
+
+
+def test_negative_results_expire():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "isins.json")
+        SymbolTable(path).resolve(ISINS[:5], __get_symbol(calls))
+        SymbolTable(path).resolve(ISINS[:5], __get_symbol(calls))
+        assert len(calls) == 5
+
+        SymbolTable(path, negative_ttl=0).resolve(ISINS[:5], __get_symbol(calls))
+        assert calls[5:] == [ISINS[0]]
+
+
+def test_limit_stops_lookups():
+    calls = []
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "isins.json")
+        symbols = SymbolTable(path).resolve(
+            ISINS, __get_symbol(calls), limit=3, concurrency=1
+        )
+        assert symbols == ["S01", "S02", "S03"]
+        assert len(calls) < len(ISINS)
+
+
+def test_failed_lookups_are_not_saved():
+    def get_symbol(isin):
+        raise IOError("429 Too Many Requests")
+
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "isins.json")
+        assert SymbolTable(path).resolve(ISINS[:3], get_symbol) == []
+        assert not any(SymbolTable(path).is_known(isin) for isin in ISINS[:3])